@@ -0,0 +1,118 @@
+"""Escape-time vs. distance rendering: time and visual detail at different values of max_iter
+
+Visual detail is measured as the overlap (intersection over union) of the dark pixels of an image with those of an
+independent reference: a supersampled escape-time rendering at a high max_iter, in which a pixel is dark if any of its
+supersample x supersample samples did not escape (the pixel contains points of the set). In escape-time images, the
+dark pixels are the ones whose center did not escape; parts of the set between pixel centers are missed (aliasing) and
+slowly escaping points count as inside at low max_iter. In distance images, pixels inside the set or closer than
+de_threshold pixels to its boundary are dark. Recall is the fraction of dark reference pixels that are dark in the
+image. Filaments thinner than the sample spacing are missed by the reference too, so dark pixels along filaments lower
+the IoU of the distance rendering although they show real detail; a set without interior (e.g. a dendritic Julia set)
+gives an empty reference and no scores.
+
+Usage (from the repository root):
+    python -m benchmarks.distance --width 800 --height 600 --supersample 4 --save distance_images
+"""
+# import statements
+import argparse
+import os
+import time
+import numpy as np
+
+# import own .py files
+from fractals.fractals import Mandelbrot, JuliaSet
+from tileserver.tiles import encode_png
+
+MAX_ITERS = [50, 100, 200, 500, 2000]
+REFERENCE_MAX_ITER = 5000
+
+# name: (fractal class, keyword arguments)
+VIEWPORTS = {
+    'full set': (Mandelbrot, {}),
+    'seahorse valley': (Mandelbrot, {'xlim': np.array([-0.80, -0.70]), 'ylim': np.array([0.05, 0.15])}),
+    'antenna': (Mandelbrot, {'xlim': np.array([-1.80, -1.70]), 'ylim': np.array([-0.05, 0.05])}),
+    'julia rabbit -0.123+0.745i': (JuliaSet, {'C': -0.123 + 0.745j}),
+}
+
+COLOR_SETTINGS = (0, 4000, 2) # cmap, unique colors, interpolation (color norm 1: escape time, 2: distance)
+
+def render(fractal, distance):
+    """Calculate and color fractal (escape time or distance rendering mode)
+
+    Returns
+    -------
+    seconds, RGB values and mask of dark pixels (inside or, in distance mode, close to the boundary)
+    """
+    t_start = time.perf_counter()
+    if distance:
+        m, ms, d = fractal.calc_distance()
+        rgb = fractal.color_fractal(m, ms, *COLOR_SETTINGS, 2, d)
+        dark = (m == fractal.max_iter) | (d < fractal.de_threshold)
+    else:
+        m, ms = fractal.calc()
+        rgb = fractal.color_fractal(m, ms, *COLOR_SETTINGS, 1)
+        dark = m == fractal.max_iter
+    return time.perf_counter() - t_start, rgb.copy(), dark.copy()
+
+def render_reference(fractal, supersample):
+    """Escape-time rendering with supersample x supersample samples per pixel at REFERENCE_MAX_ITER
+
+    Returns
+    -------
+    seconds and mask of pixels that contain at least one sample that did not escape
+    """
+    t_start = time.perf_counter()
+    s = supersample
+    # samples are spaced 1/s pixel apart and centered on the pixel centers of fractal
+    pixel_x = (fractal.xlim[1] - fractal.xlim[0]) / (fractal.width - 1)
+    pixel_y = (fractal.ylim[1] - fractal.ylim[0]) / (fractal.height - 1)
+    margin_x, margin_y = pixel_x * (s - 1) / (2 * s), pixel_y * (s - 1) / (2 * s)
+    kwargs = {'C': fractal.C} if isinstance(fractal, JuliaSet) else {}
+    reference = type(fractal)(fractal.width * s, fractal.height * s, REFERENCE_MAX_ITER, esc_radius_sq = fractal.esc_radius_sq,
+                              xlim = np.array([fractal.xlim[0] - margin_x, fractal.xlim[1] + margin_x]),
+                              ylim = np.array([fractal.ylim[0] - margin_y, fractal.ylim[1] + margin_y]), **kwargs)
+    m, ms = reference.calc()
+    inside = (m == REFERENCE_MAX_ITER).reshape(fractal.height, s, fractal.width, s)
+    return time.perf_counter() - t_start, inside.any(axis = (1, 3))
+
+def score(dark, reference):
+    """Intersection over union and recall of dark pixels compared to reference (None if the reference is empty)"""
+    if not reference.any():
+        return None
+    return (dark & reference).sum() / (dark | reference).sum(), (dark & reference).sum() / reference.sum()
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Escape-time vs. distance rendering')
+    parser.add_argument('--width', type = int, default = 640)
+    parser.add_argument('--height', type = int, default = 480)
+    parser.add_argument('--viewport', choices = list(VIEWPORTS), help = 'only run given viewport')
+    parser.add_argument('--supersample', type = int, default = 3, help = 'samples per pixel side of the reference')
+    parser.add_argument('--save', help = 'directory to write the rendered images to')
+    args = parser.parse_args()
+    if args.save is not None:
+        os.makedirs(args.save, exist_ok = True)
+
+    for name, (fractal_cls, kwargs) in VIEWPORTS.items():
+        if args.viewport is not None and name != args.viewport:
+            continue
+        fractal = fractal_cls(args.width, args.height, MAX_ITERS[0], **kwargs)
+        render(fractal, True) # compile / load kernels
+        reference_time, reference = render_reference(fractal, args.supersample)
+        print('{} (reference: escape time with {}x{} samples per pixel and max_iter {}, {:.2f}s)'.format(
+            name, args.supersample, args.supersample, REFERENCE_MAX_ITER, reference_time))
+        print('  {:>8}  {:>30}  {:>30}'.format('max_iter', 'escape time: s / IoU / recall', 'distance: s / IoU / recall'))
+        for max_iter in MAX_ITERS:
+            fractal.max_iter = max_iter
+            results = []
+            for distance in (False, True):
+                seconds, rgb, dark = render(fractal, distance)
+                scores = score(dark, reference)
+                results.append('{:8.3f} / {}'.format(seconds, '{:.3f} / {:.3f}'.format(*scores) if scores is not None else 'n/a (empty reference)'))
+                if args.save is not None:
+                    filename = '{}_{}_{}.png'.format(name.replace(' ', '_'), max_iter, 'distance' if distance else 'escape')
+                    with open(os.path.join(args.save, filename), 'wb') as f:
+                        f.write(encode_png(rgb))
+            print('  {:>8}  {:>30}  {:>30}'.format(max_iter, *results))
+
+if __name__ == '__main__':
+    main()
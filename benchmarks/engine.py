@@ -0,0 +1,197 @@
+"""Reproducible benchmark of the fractal engine
+
+Times Mandelbrot.calc / JuliaSet.calc, Fractal.color_fractal and GUI.make_surface separately and end to end for every
+resolution preset of main.fetch_options, several values of max_iter and a fixed set of viewports. Runs headless on the CPU.
+
+Usage (from the repository root):
+    python -m benchmarks.engine --save baseline.json
+    python -m benchmarks.engine --compare baseline.json --threshold 0.1
+"""
+# import statements
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy') # headless pygame
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import platform
+import sys
+import time
+import numpy as np
+
+# import own .py files
+from main import fetch_options
+from fractals import backends
+from fractals.fractals import Mandelbrot, JuliaSet
+from pygameGUI.GUI import GUI
+
+MAX_ITERS = [100, 500, 2000]
+
+# name: (fractal class, keyword arguments); Julia sets are calculated on half of the window width (as in main.py)
+VIEWPORTS = {
+    'full set': (Mandelbrot, {}),
+    'seahorse valley': (Mandelbrot, {'xlim': np.array([-0.80, -0.70]), 'ylim': np.array([0.05, 0.15])}),
+    'deep interior': (Mandelbrot, {'xlim': np.array([-0.30, -0.10]), 'ylim': np.array([-0.10, 0.10])}),
+    'julia -0.8+0.156i': (JuliaSet, {'C': -0.8 + 0.156j}),
+    'julia 0.285+0.01i': (JuliaSet, {'C': 0.285 + 0.01j}),
+    'julia -0.4+0.6i': (JuliaSet, {'C': -0.4 + 0.6j}),
+    'julia -0.7269+0.1889i': (JuliaSet, {'C': -0.7269 + 0.1889j}),
+}
+
+# settings used for coloring (default settings of main.py: cmap, unique colors, interpolation, color norm)
+COLOR_SETTINGS = (0, 4000, 2, 1)
+
+def fetch_resolutions():
+    """Return (width, height) of every resolution preset in main.fetch_options"""
+    resolutions = []
+    for option in fetch_options()[1][0]:
+        width, height = option.split(' ')[0].split('x')
+        resolutions.append((int(width), int(height)))
+    return resolutions
+
+def best_time(func, repeats):
+    """Run func once to warm up, then return the best wall time of given number of runs"""
+    func()
+    timings = []
+    for i in range(repeats):
+        t_start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t_start)
+    return min(timings)
+
+def run_case(gui, fractal_cls, kwargs, width, height, max_iter, repeats):
+    """Time all stages of one benchmark case
+
+    Returns
+    -------
+    dict containing best time in seconds of calc, color, surface and end_to_end
+    """
+    if fractal_cls is JuliaSet:
+        width = int(width / 2)
+    fractal = fractal_cls(width, height, max_iter, **kwargs)
+    m, ms = fractal.calc()
+    mu_rgb = fractal.color_fractal(m, ms, *COLOR_SETTINGS)
+
+    def end_to_end():
+        m, ms = fractal.calc()
+        gui.make_surface(fractal.color_fractal(m, ms, *COLOR_SETTINGS))
+
+    return {
+        'calc': best_time(fractal.calc, repeats),
+        'color': best_time(lambda: fractal.color_fractal(m, ms, *COLOR_SETTINGS), repeats),
+        'surface': best_time(lambda: gui.make_surface(mu_rgb), repeats),
+        'end_to_end': best_time(end_to_end, repeats),
+    }
+
+def run_suite(resolutions, max_iters, viewports, repeats, verbose = True):
+    """Run every combination of resolution, max_iter and viewport
+
+    Returns
+    -------
+    dict mapping case name ('<viewport>/<width>x<height>/iter<max_iter>') to timings of run_case
+    """
+    import pygame
+    pygame.display.init()
+    gui = GUI('benchmark', 1, 1)
+    results = {}
+    for width, height in resolutions:
+        for max_iter in max_iters:
+            for name in viewports:
+                fractal_cls, kwargs = VIEWPORTS[name]
+                case = '{}/{}x{}/iter{}'.format(name, width, height, max_iter)
+                results[case] = run_case(gui, fractal_cls, kwargs, width, height, max_iter, repeats)
+                if verbose:
+                    print('{:<45} '.format(case) + '  '.join('{} {:8.2f} ms'.format(stage, t * 1000) for stage, t in results[case].items()))
+    return results
+
+def fetch_metadata():
+    """Return information about the machine and software the benchmark ran on"""
+    try:
+        import numba
+        numba_version = numba.__version__
+    except ImportError:
+        numba_version = None
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'numba': numba_version,
+            'platform': platform.platform(), 'cpu_count': os.cpu_count(), 'backend': backends.get_backend().name}
+
+MATCHING_METADATA = ['backend', 'cpu_count'] # timings are only comparable if these are the same
+
+def compare_metadata(baseline_metadata, metadata):
+    """Return list of tuples (key, baseline value, new value) of all metadata that differs"""
+    return [(key, baseline_metadata.get(key), value) for key, value in metadata.items() if baseline_metadata.get(key) != value]
+
+def compare(baseline, results, threshold):
+    """Compare results with baseline
+
+    Args
+    ----
+    baseline, results: dict
+        timings per case (see run_suite)
+    threshold: float
+        relative slowdown above which a stage counts as regression (0.1 == 10 % slower)
+
+    Returns
+    -------
+    regressions: list of tuples (case, stage, baseline time, new time)
+    missing: list of cases / stages ('<case> <stage>') of the baseline that were not run
+    new: list of cases / stages that are not in the baseline (and could not be compared)
+    """
+    regressions, new = [], []
+    for case, timings in results.items():
+        for stage, t in timings.items():
+            t_base = baseline.get(case, {}).get(stage)
+            if t_base is None:
+                new.append('{} {}'.format(case, stage))
+            elif t > t_base * (1 + threshold):
+                regressions.append((case, stage, t_base, t))
+    missing = ['{} {}'.format(case, stage) for case, timings in baseline.items() for stage in timings
+               if stage not in results.get(case, {})]
+    return regressions, missing, new
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Benchmark the fractal engine')
+    parser.add_argument('--repeats', type = int, default = 3, help = 'timed runs per stage (best one is kept)')
+    parser.add_argument('--quick', action = 'store_true', help = 'only smallest resolution and max_iter 100')
+    parser.add_argument('--viewport', action = 'append', choices = list(VIEWPORTS), help = 'only run given viewport(s)')
+    parser.add_argument('--backend', choices = list(backends.BACKENDS), help = 'compute backend (default: numba-parallel)')
+    parser.add_argument('--save', help = 'write results as JSON baseline to given path')
+    parser.add_argument('--compare', help = 'compare results with JSON baseline at given path')
+    parser.add_argument('--threshold', type = float, default = 0.1, help = 'relative slowdown that counts as regression')
+    args = parser.parse_args()
+
+    if args.backend:
+        backends.select_backend(args.backend)
+    resolutions = fetch_resolutions()
+    max_iters = MAX_ITERS
+    if args.quick:
+        resolutions, max_iters = [min(resolutions, key = lambda r: r[0] * r[1])], MAX_ITERS[:1]
+    results = run_suite(resolutions, max_iters, args.viewport or list(VIEWPORTS), args.repeats)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'metadata': fetch_metadata(), 'results': results}, f, indent = 2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        failed = False
+        for key, base_value, value in compare_metadata(baseline.get('metadata', {}), fetch_metadata()):
+            level = 'ERROR' if key in MATCHING_METADATA else 'WARNING'
+            print('{} {} differs from baseline: {} -> {}'.format(level, key, base_value, value))
+            failed |= key in MATCHING_METADATA
+        regressions, missing, new = compare(baseline['results'], results, args.threshold)
+        for case, stage, t_base, t in regressions:
+            print('REGRESSION {} {}: {:.2f} ms -> {:.2f} ms ({:+.0%})'.format(case, stage, t_base * 1000, t * 1000, t / t_base - 1))
+        for name in new:
+            print('NEW {} (not in baseline, save a new baseline to compare it)'.format(name))
+        if missing:
+            print('{} case stage(s) of the baseline were not run (e.g. --quick or --viewport)'.format(len(missing)))
+        print('{} regression(s) above {:.0%} threshold, {} of {} case stage(s) compared'.format(
+            len(regressions), args.threshold, sum(len(timings) for timings in results.values()) - len(new),
+            sum(len(timings) for timings in results.values())))
+        if failed:
+            print('timings of a baseline from another backend or machine are not comparable')
+        if regressions or new or failed:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Scaling of the tile render farm (renderfarm/) with the number of local workers
+
+Renders the same job with 1, 2, 4, ... local workers and reports wall time, throughput and speedup relative to one
+worker (a job with one worker is always run as baseline). Speedup is only linear as long as there are enough cores for
+the workers (and the coordinator).
+
+Usage (from the repository root):
+    python -m benchmarks.farm_scaling --workers 1 2 4 --width 4000 --height 3000 --max-iter 1000
+"""
+# import statements
+import argparse
+import os
+import subprocess
+import time
+
+# import own .py files
+from fractals.fractals import Mandelbrot
+from renderfarm.coordinator import Coordinator, RenderJob, start_local_workers
+
+def run_job(n_workers, width, height, max_iter, tile_size, backend = None, start_timeout = 60.0):
+    """Render one job with n_workers local workers and return its duration in seconds
+
+    Raises
+    ------
+    RuntimeError if a worker exits or not all workers connect within start_timeout seconds
+    """
+    coordinator = Coordinator(port = 0)
+    processes = start_local_workers(coordinator.address[1], n_workers, backend)
+    try:
+        # wait until all workers are connected, so their start-up is not part of the measurement
+        warmup = RenderJob(Mandelbrot(tile_size, tile_size * n_workers * 2, 10), tile_size)
+        deadline = time.perf_counter() + start_timeout
+        while sum(stats['connected'] for stats in coordinator.workers.values()) < n_workers:
+            exited = [process for process in processes if process.poll() is not None]
+            if exited:
+                raise RuntimeError('{} of {} local workers exited during start-up'.format(len(exited), n_workers))
+            if time.perf_counter() > deadline:
+                raise RuntimeError('local workers did not connect within {}s'.format(start_timeout))
+            try:
+                coordinator.run(warmup, timeout = 1.0)
+            except TimeoutError: # check workers again
+                pass
+        return coordinator.run(RenderJob(Mandelbrot(width, height, max_iter), tile_size))
+    finally:
+        coordinator.close()
+        for process in processes:
+            try:
+                process.wait(timeout = 10)
+            except subprocess.TimeoutExpired: # e.g. worker that never connected
+                process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Scaling of the tile render farm with the number of local workers')
+    parser.add_argument('--workers', type = int, nargs = '+', default = [1, 2, 4])
+    parser.add_argument('--width', type = int, default = 3000)
+    parser.add_argument('--height', type = int, default = 2250)
+    parser.add_argument('--max-iter', type = int, default = 1000)
+    parser.add_argument('--tile', type = int, default = 256)
+    parser.add_argument('--backend', help = 'compute backend of the workers')
+    args = parser.parse_args()
+
+    print('{} CPUs, {}x{} pixels, max_iter {}'.format(os.cpu_count(), args.width, args.height, args.max_iter))
+    baseline = None
+    for n_workers in [1] + [n for n in args.workers if n != 1]: # one worker first: baseline of the speedup
+        duration = run_job(n_workers, args.width, args.height, args.max_iter, args.tile, args.backend)
+        baseline = baseline if baseline is not None else duration
+        print('{:>3} workers: {:7.2f}s  {:6.2f} Mpixel/s  speedup {:5.2f} (vs. 1 worker)'.format(
+            n_workers, duration, args.width * args.height / duration / 1e6, baseline / duration))
+
+if __name__ == '__main__':
+    main()
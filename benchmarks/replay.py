@@ -0,0 +1,157 @@
+"""Replay a recorded session through main.main and report click-to-frame / hover-to-frame latency
+
+Record a session with `FRACTALS_RECORD=session.jsonl python main.py`, then replay it headless (SDL dummy video driver, the
+settings window is replaced by the recorded settings) with `python -m benchmarks.replay session.jsonl`.
+
+The latency of an event is the time from the moment it was recorded (relative to the start of the replay) until the
+display update after the frame it triggered, so it includes the time the event waited while earlier frames were rendered.
+"""
+# import statements
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy') # headless pygame
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import time
+import numpy as np
+import pygame
+
+# import own .py files
+import main
+from fractals import warmup
+from pygameGUI.session import RecordedSettings, dict_to_event, load_session
+
+class TrackedEvents(list):
+    """List of events that remembers which event main.main is currently handling"""
+    def __init__(self, events, replayer):
+        super().__init__(events)
+        self.replayer = replayer
+
+    def __iter__(self):
+        for event in super().__iter__():
+            self.replayer.current = event
+            yield event
+        self.replayer.current = None
+
+class Replayer(object):
+    """Feeds recorded events to main.main at their recorded time and measures the latency of every event that led to a frame"""
+    def __init__(self, entries, speed = 1.0):
+        """Constructor of Replayer class instance
+
+        Args
+        ----
+        entries: list of dicts
+            recorded session (see pygameGUI.session.load_session)
+        speed: float
+            replay speed (2.0 == events are sent twice as fast as recorded)
+        """
+        self.events = [entry for entry in entries if entry['kind'] == 'event']
+        self.settings = [entry for entry in entries if entry['kind'] == 'settings']
+        self.speed = speed
+        self.next_event = 0
+        self.t_start = None
+        self.current = None
+        self.release_time = {} # id of event -> time the event was handed to main.main
+        self.kind = {} # id of event -> interaction type of event that triggered a frame
+        self.latencies = {}
+
+    def scheduled_time(self, entry):
+        return self.t_start + entry['t'] / self.speed
+
+    def open_settings(self, label_names, options, var):
+        """Replaces main.show_ui: returns next recorded settings"""
+        warmup.wait() # the recorded time in the settings window covers the warm-up
+        if self.current is not None:
+            self.kind[id(self.current)] = 'settings'
+        if not self.settings:
+            return RecordedSettings(var)
+        entry = self.settings.pop(0)
+        # shift clock so that following events keep their recorded distance to the closing of the settings window
+        now = time.perf_counter()
+        if self.t_start is None:
+            self.t_start = now
+        self.t_start += now - self.scheduled_time(entry)
+        return RecordedSettings(entry['var'])
+
+    def get_events(self):
+        """Replaces pygame.event.get: returns all recorded events that are due (QUIT after the last one)"""
+        if self.t_start is None:
+            self.t_start = time.perf_counter()
+        if self.next_event >= len(self.events):
+            return TrackedEvents([pygame.event.Event(pygame.QUIT)], self)
+        now = time.perf_counter()
+        wait = self.scheduled_time(self.events[self.next_event]) - now
+        if wait > 0: # nothing due yet
+            time.sleep(min(wait, 0.05))
+            return TrackedEvents([], self)
+        events = []
+        while self.next_event < len(self.events) and self.scheduled_time(self.events[self.next_event]) <= now:
+            entry = self.events[self.next_event]
+            event = dict_to_event(entry)
+            self.release_time[id(event)] = self.scheduled_time(entry)
+            events.append(event)
+            self.next_event += 1
+        return TrackedEvents(events, self)
+
+    def track_display_fractal(self, display_fractal):
+        """Wrap main.display_fractal to remember which events triggered a frame"""
+        def tracked_display_fractal(*args, **kwargs):
+            if self.current is not None and id(self.current) not in self.kind:
+                self.kind[id(self.current)] = {pygame.MOUSEBUTTONDOWN: 'click', pygame.MOUSEMOTION: 'hover'}.get(self.current.type, 'key')
+            return display_fractal(*args, **kwargs)
+        return tracked_display_fractal
+
+    def on_frame(self, events):
+        """Called by main.main after every display update: store latency of all events that triggered a frame"""
+        now = time.perf_counter()
+        for event in events:
+            kind = self.kind.pop(id(event), None)
+            release_time = self.release_time.pop(id(event), None)
+            if kind is not None and release_time is not None:
+                self.latencies.setdefault(kind, []).append(now - release_time)
+
+    def run(self):
+        """Replay session through main.main
+
+        Returns
+        -------
+        latencies: dict
+            interaction type ('click', 'hover', 'settings', 'key') -> list of latencies in seconds
+        """
+        display_fractal = main.display_fractal
+        main.display_fractal = self.track_display_fractal(display_fractal)
+        try:
+            main.main(self.get_events, self.open_settings, self.on_frame)
+        except SystemExit: # main.main ends with quit()
+            pass
+        finally:
+            main.display_fractal = display_fractal
+        return self.latencies
+
+def summarize(latencies):
+    """Return count and p50 / p95 / p99 / max latency in milliseconds for every interaction type"""
+    summary = {}
+    for kind, values in latencies.items():
+        values = np.array(values) * 1000
+        summary[kind] = {'count': len(values), 'p50_ms': float(np.percentile(values, 50)), 'p95_ms': float(np.percentile(values, 95)),
+                         'p99_ms': float(np.percentile(values, 99)), 'max_ms': float(values.max())}
+    return summary
+
+def run():
+    parser = argparse.ArgumentParser(description = 'Replay recorded session and report latency per interaction type')
+    parser.add_argument('session', help = 'JSON lines file recorded with FRACTALS_RECORD=<path> python main.py')
+    parser.add_argument('--speed', type = float, default = 1.0, help = 'replay speed factor')
+    parser.add_argument('--json', help = 'write summary to given file')
+    args = parser.parse_args()
+
+    summary = summarize(Replayer(load_session(args.session), args.speed).run())
+    for kind, stats in sorted(summary.items()):
+        print('{:<9} n={:<5} p50 {:8.2f} ms  p95 {:8.2f} ms  p99 {:8.2f} ms  max {:8.2f} ms'.format(
+            kind, stats['count'], stats['p50_ms'], stats['p95_ms'], stats['p99_ms'], stats['max_ms']))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent = 2)
+
+if __name__ == '__main__':
+    run()
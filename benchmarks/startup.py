@@ -0,0 +1,114 @@
+"""Measure time to first frame of a fresh python process and spin-up time of worker processes
+
+Run from the repository root with `python -m benchmarks.startup`. Each scenario is run in a new process so that the import,
+numba compilation / cache loading and the first calculation are part of the measurement. The worker scenarios start a
+process like the ones of the tile server, render farm, Julia prefetcher and multiprocessing-tiles backend (with the
+single-threaded backend these select, or a given one) and render one small tile.
+"""
+# import statements
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# import own .py files
+from fractals import backends
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# code that is run in the child process (prints time from process start to the first colored frame)
+CHILD_CODE = """
+import time
+t_start = time.perf_counter()
+from fractals import backends, warmup
+warmup.start()
+if {use_jit}:
+    warmup.wait()
+from fractals.fractals import Mandelbrot
+t_import = time.perf_counter()
+mandel = Mandelbrot({width}, {height}, {max_iter})
+m, ms = mandel.calc()
+mu_rgb = mandel.color_fractal(m, ms, 0, 4000, 2, 1)
+t_frame = time.perf_counter()
+print(backends.get_backend().name, t_import - t_start, t_frame - t_start)
+"""
+
+# code that is run in the child process of a worker scenario (prints time from process start to the first rendered tile)
+WORKER_CODE = """
+import time
+t_start = time.perf_counter()
+from fractals import backends
+backends.select_backend({backend!r} or backends.get_serial_backend().name)
+from fractals.fractals import Mandelbrot
+t_import = time.perf_counter()
+Mandelbrot({tile}, {tile}, {max_iter}).render(0, 4000, 2, 1)
+t_frame = time.perf_counter()
+print(backends.get_backend().name, t_import - t_start, t_frame - t_start)
+"""
+
+WORKER_BACKENDS = [None, 'aot', 'numba-serial', 'numpy'] # None: backend chosen by get_serial_backend
+
+def run_child(code, cache_dir):
+    """Run code in a new python process and return the used backend, import time, time to first frame and wall time"""
+    env = dict(os.environ, NUMBA_CACHE_DIR = cache_dir)
+    t_start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', code], cwd = REPO_ROOT, env = env, capture_output = True, text = True, check = True)
+    wall = time.perf_counter() - t_start
+    backend, t_import, t_frame = out.stdout.split()[-3:]
+    return {'backend': backend, 'import_s': float(t_import), 'first_frame_s': float(t_frame), 'process_s': wall}
+
+def run_scenario(use_jit, cache_dir, width, height, max_iter):
+    """Start a new python process that renders one frame
+
+    Args
+    ----
+    use_jit: boolean
+        whether to wait for the numba kernels (otherwise the ahead-of-time compiled kernels are used while they are loading)
+    cache_dir: str
+        directory numba caches compiled kernels in (an empty directory simulates a cold start)
+    width, height, max_iter: int
+        resolution and maximum number of iterations of the frame
+
+    Returns
+    -------
+    dict containing the used backend, the import time, the time to first frame and the wall time of the whole process
+    """
+    return run_child(CHILD_CODE.format(use_jit = use_jit, width = width, height = height, max_iter = max_iter), cache_dir)
+
+def run_worker_scenario(backend, cache_dir, tile, max_iter):
+    """Start a new python process like a worker process and render one tile of tile x tile pixels (see run_scenario)"""
+    return run_child(WORKER_CODE.format(backend = backend, tile = tile, max_iter = max_iter), cache_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Measure time to first frame of a fresh process')
+    parser.add_argument('--width', type = int, default = 1280)
+    parser.add_argument('--height', type = int, default = 960)
+    parser.add_argument('--max-iter', type = int, default = 100)
+    parser.add_argument('--tile', type = int, default = 256, help = 'side of the tile rendered in the worker scenarios')
+    parser.add_argument('--json', help = 'write results to given file')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as cold_cache:
+        results['jit (cold cache)'] = run_scenario(True, cold_cache, args.width, args.height, args.max_iter)
+        results['jit (warm cache)'] = run_scenario(True, cold_cache, args.width, args.height, args.max_iter)
+        results['default'] = run_scenario(False, cold_cache, args.width, args.height, args.max_iter)
+        # worker processes start with the (now warm) cache, as the main process compiled the kernels before
+        for backend in WORKER_BACKENDS:
+            if backend is not None and backend not in backends.available_backends():
+                continue
+            run_worker_scenario(backend, cold_cache, args.tile, args.max_iter) # compile kernels used by worker only
+            results['worker ({})'.format(backend or 'default')] = run_worker_scenario(backend, cold_cache, args.tile, args.max_iter)
+
+    for name, result in results.items():
+        print('{:<22} backend: {:<14} import: {:6.3f}s  first frame: {:6.3f}s  process: {:6.3f}s'.format(
+            name, result['backend'], result['import_s'], result['first_frame_s'], result['process_s']))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent = 2)
+
+if __name__ == '__main__':
+    main()
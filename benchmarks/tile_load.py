@@ -0,0 +1,82 @@
+"""Load test of the local tile server (tileserver/server.py)
+
+Starts a tile server on a free localhost port with an empty temporary store (or uses --url) and lets several clients
+request tiles concurrently. Many clients request the same tiles at the same time, so the report shows how many requests
+were answered from the store, rendered, or merged with a running render.
+
+Usage (from the repository root):
+    python -m benchmarks.tile_load --clients 16 --requests 400 --zoom 3
+"""
+# import statements
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# import own .py files
+from tileserver.server import TileRenderer, TileServer
+from tileserver.store import TileStore
+
+def fetch(url):
+    """Request url and return latency in seconds and value of X-Tile-Cache header"""
+    t_start = time.perf_counter()
+    with urllib.request.urlopen(url) as response:
+        response.read()
+        status = response.headers.get('X-Tile-Cache')
+    return time.perf_counter() - t_start, status
+
+def run_load(base_url, clients, requests, zoom, seed = 0):
+    """Request random tiles of given zoom level from clients concurrent threads
+
+    Returns
+    -------
+    dict containing throughput, latency percentiles and number of requests per cache status
+    """
+    rng = random.Random(seed)
+    urls = ['{}/mandelbrot/{}/{}/{}.png'.format(base_url, zoom, rng.randrange(2**zoom), rng.randrange(2**zoom)) for i in range(requests)]
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = clients) as executor:
+        results = list(executor.map(fetch, urls))
+    duration = time.perf_counter() - t_start
+    latencies = np.array([latency for latency, status in results]) * 1000
+    statuses = [status for latency, status in results]
+    return {'requests': requests, 'duration_s': duration, 'requests_per_s': requests / duration,
+            'p50_ms': float(np.percentile(latencies, 50)), 'p95_ms': float(np.percentile(latencies, 95)),
+            'p99_ms': float(np.percentile(latencies, 99)), 'status': {s: statuses.count(s) for s in sorted(set(statuses))}}
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Load test of the local tile server')
+    parser.add_argument('--url', help = 'base url of a running tile server (default: start one with an empty store)')
+    parser.add_argument('--clients', type = int, default = 16, help = 'number of concurrent clients')
+    parser.add_argument('--requests', type = int, default = 400, help = 'total number of requests')
+    parser.add_argument('--zoom', type = int, default = 3, help = 'zoom level of requested tiles (4^zoom different tiles)')
+    parser.add_argument('--workers', type = int, help = 'render processes of the started server')
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        store_dir = tempfile.mkdtemp(prefix = 'tile_store_')
+        server = TileServer(TileRenderer(TileStore(store_dir), args.workers), port = 0)
+        threading.Thread(target = server.serve_forever, daemon = True).start()
+        base_url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    try:
+        for label in ('cold', 'warm'): # second run is answered from the store
+            result = run_load(base_url, args.clients, args.requests, args.zoom)
+            print('{}: {requests} requests in {duration_s:.2f}s ({requests_per_s:.1f}/s), p50 {p50_ms:.1f} ms, p95 {p95_ms:.1f} ms, '
+                  'p99 {p99_ms:.1f} ms, {status}'.format(label, **result))
+        with urllib.request.urlopen(base_url + '/stats') as response:
+            print('server stats:', json.loads(response.read()))
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            server.renderer.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Ahead-of-time compiled versions of the core kernels (no numba needed at runtime)
+
+Build once with `python -m fractals.aot`, which writes the extension module fractals/_kernels_aot into the fractals package.
+The compiled kernels run single-threaded, but importing them is instant, which makes them a good fit for the first frame
+(while the parallel numba kernels are still loading) and for worker processes.
+"""
+# import statements
+import os
+import numpy as np
+
+MODULE_NAME = '_kernels_aot'
+
+def load():
+    """Import the compiled extension module
+
+    Returns
+    -------
+    compiled module or None if it has not been built
+    """
+    try:
+        from fractals import _kernels_aot
+    except ImportError:
+        return None
+    return _kernels_aot
+
+def available():
+    """Return True if the ahead-of-time compiled kernels have been built"""
+    return load() is not None
+
+def has_kernel(name):
+    """Return True if the built extension module exports kernel name (older builds lack the newer kernels)"""
+    return hasattr(load(), name + '_u16')
+
+def _suffix(arr):
+    """Return name suffix of exported kernel that matches the dtype of given buffer"""
+    return 'u16' if arr.dtype == np.uint16 else 'u32'
+
+def mandelbrot(Z, max_iter, esc_radius_sq, m_output, ms_output):
+    """Same as serial.mandelbrot_serial for preallocated uint16 / uint32 and float32 buffers"""
+    getattr(load(), 'mandelbrot_' + _suffix(m_output))(Z, max_iter, esc_radius_sq, m_output, ms_output)
+
+def julia(Z, C, max_iter, esc_radius_sq, m_output, ms_output):
+    """Same as serial.julia_serial for preallocated uint16 / uint32 and float32 buffers"""
+    getattr(load(), 'julia_' + _suffix(m_output))(Z, C, max_iter, esc_radius_sq, m_output, ms_output)
+
+def mandelbrot_distance(Z, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+    """Same as serial.mandelbrot_de_serial for preallocated uint16 / uint32 and float32 buffers"""
+    getattr(load(), 'mandelbrot_de_' + _suffix(m_output))(Z, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output)
+
+def julia_distance(Z, C, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+    """Same as serial.julia_de_serial for preallocated uint16 / uint32 and float32 buffers"""
+    getattr(load(), 'julia_de_' + _suffix(m_output))(Z, C, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output)
+
+def fetch_iter_color(mu, cmap, output):
+    """Same as serial.fetch_iter_color_serial for uint16 / uint32 mu and preallocated uint8 output"""
+    getattr(load(), 'fetch_iter_color_' + _suffix(mu))(mu, cmap, output)
+
+def build(output_dir = None):
+    """Compile the kernels ahead of time with numba.pycc
+
+    Args
+    ----
+    output_dir: str
+        directory the extension module is written to (default: fractals package directory)
+    """
+    from numba.pycc import CC
+    from numba import void, float32, float64, int64, uint8, uint16, uint32, complex128
+    from fractals.serial import mandelbrot_serial, julia_serial, fetch_iter_color_serial, mandelbrot_de_serial, julia_de_serial
+
+    cc = CC(MODULE_NAME)
+    cc.output_dir = output_dir if output_dir is not None else os.path.dirname(os.path.abspath(__file__))
+    for suffix, m_type in (('u16', uint16), ('u32', uint32)):
+        cc.export('mandelbrot_' + suffix, void(complex128[:, :], int64, float64, m_type[:, :], float32[:, :]))(mandelbrot_serial.py_func)
+        cc.export('julia_' + suffix, void(complex128[:, :], complex128, int64, float64, m_type[:, :], float32[:, :]))(julia_serial.py_func)
+        cc.export('fetch_iter_color_' + suffix, void(m_type[:, :], int64[:, :], uint8[:, :, :]))(fetch_iter_color_serial.py_func)
+        cc.export('mandelbrot_de_' + suffix, void(complex128[:, :], int64, float64, float64, m_type[:, :], float32[:, :],
+                                                  float32[:, :]))(mandelbrot_de_serial.py_func)
+        cc.export('julia_de_' + suffix, void(complex128[:, :], complex128, int64, float64, float64, m_type[:, :], float32[:, :],
+                                             float32[:, :]))(julia_de_serial.py_func)
+    cc.compile()
+
+if __name__ == '__main__':
+    build()
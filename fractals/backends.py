@@ -0,0 +1,437 @@
+"""Compute backends that calculate the iteration counts and colors of a fractal
+
+Every backend writes into preallocated output buffers (see fractals.buffers). The backend that is used can be chosen with
+select_backend or the environment variable FRACTALS_BACKEND; otherwise calibrate picks the fastest one for this machine.
+"""
+# import own .py files
+from fractals import aot, warmup
+
+# import statements
+import importlib.util
+import itertools
+import math
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+ENV_VAR = 'FRACTALS_BACKEND'
+
+class Backend(object):
+    """Interface of a compute backend"""
+    name = None
+    uses_processes = False # backends with a process pool are left out of calibrate (starting the pool takes seconds)
+
+    def available(self):
+        """Return True if the backend can be used on this machine"""
+        return True
+
+    def shutdown(self):
+        """Release resources such as worker processes (they are started again on the next use)"""
+        pass
+
+    def mandelbrot(self, Z, max_iter, esc_radius_sq, m_output, ms_output):
+        """Write simple & smoothed iteration count of the Mandelbrot set for complex plane Z into m_output, ms_output
+
+        Args
+        ----
+        Z: np.array
+            2D array that contains all complex values we want to evaluate
+        max_iter: int
+            maximum number of iterations to be computed for each point
+        esc_radius_sq: float
+            squared escape radius
+        m_output, ms_output: np.array
+            preallocated uint16 / uint32 and float32 buffers of same shape as Z
+        """
+        raise NotImplementedError
+
+    def julia(self, Z, C, max_iter, esc_radius_sq, m_output, ms_output):
+        """Write simple & smoothed iteration count of the Julia set for constant C into m_output, ms_output (see mandelbrot)"""
+        raise NotImplementedError
+
+    def mandelbrot_distance(self, Z, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+        """Same as mandelbrot, but also write the exterior distance estimate of every point into d_output
+
+        Args
+        ----
+        far_distance: float
+            points whose distance estimate exceeds far_distance at esc_radius_sq stop early (see serial.mandelbrot_de_gu)
+        d_output: np.array
+            preallocated float32 buffer (-1 for points that did not escape)
+        """
+        raise NotImplementedError
+
+    def julia_distance(self, Z, C, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+        """Same as julia, but also write the exterior distance estimate of every point into d_output (see mandelbrot_distance)"""
+        raise NotImplementedError
+
+    def fetch_iter_color(self, mu, cmap, output):
+        """Write RGB color cmap[mu] of every point into output
+
+        Args
+        ----
+        mu: np.array
+            2D uint16 / uint32 array of color ids
+        cmap: np.array
+            int64 colormap with shape (unique_colors, 3)
+        output: np.array
+            preallocated uint8 buffer with shape mu.shape + (3,)
+        """
+        raise NotImplementedError
+
+class NumbaParallelBackend(Backend):
+    """Multithreaded numba gufuncs (fractals.gufunc)"""
+    name = 'numba-parallel'
+
+    def available(self):
+        return importlib.util.find_spec('numba') is not None
+
+    def mandelbrot(self, Z, max_iter, esc_radius_sq, m_output, ms_output):
+        import fractals.gufunc as gufunc
+        gufunc.mandelbrot_numpy_gu(Z, max_iter, esc_radius_sq, m_output, ms_output,
+                                   signature = (np.complex128, np.int64, np.float64, m_output.dtype, ms_output.dtype))
+
+    def julia(self, Z, C, max_iter, esc_radius_sq, m_output, ms_output):
+        import fractals.gufunc as gufunc
+        gufunc.julia_numpy_gu(Z, C, max_iter, esc_radius_sq, m_output, ms_output,
+                              signature = (np.complex128, np.complex128, np.int64, np.float64, m_output.dtype, ms_output.dtype))
+
+    def mandelbrot_distance(self, Z, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+        import fractals.gufunc as gufunc
+        gufunc.mandelbrot_de_numpy_gu(Z, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output,
+                                      signature = (np.complex128, np.int64, np.float64, np.float64, m_output.dtype, np.float32, np.float32))
+
+    def julia_distance(self, Z, C, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+        import fractals.gufunc as gufunc
+        gufunc.julia_de_numpy_gu(Z, C, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output,
+                                 signature = (np.complex128, np.complex128, np.int64, np.float64, np.float64, m_output.dtype, np.float32, np.float32))
+
+    def fetch_iter_color(self, mu, cmap, output):
+        import fractals.gufunc as gufunc
+        gufunc.fetch_iter_color_numpy_gu(mu, cmap, output, signature = (mu.dtype, np.int64, np.uint8))
+
+class NumbaSerialBackend(NumbaParallelBackend):
+    """Single-threaded numba kernels (fractals.serial, compiled on first use; does not load the parallel gufuncs)"""
+    name = 'numba-serial'
+
+    def mandelbrot(self, Z, max_iter, esc_radius_sq, m_output, ms_output):
+        import fractals.serial as serial
+        serial.mandelbrot_serial(Z, max_iter, float(esc_radius_sq), m_output, ms_output)
+
+    def julia(self, Z, C, max_iter, esc_radius_sq, m_output, ms_output):
+        import fractals.serial as serial
+        serial.julia_serial(Z, complex(C), max_iter, float(esc_radius_sq), m_output, ms_output)
+
+    def mandelbrot_distance(self, Z, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+        import fractals.serial as serial
+        serial.mandelbrot_de_serial(Z, max_iter, float(esc_radius_sq), float(far_distance), m_output, ms_output, d_output)
+
+    def julia_distance(self, Z, C, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+        import fractals.serial as serial
+        serial.julia_de_serial(Z, complex(C), max_iter, float(esc_radius_sq), float(far_distance), m_output, ms_output, d_output)
+
+    def fetch_iter_color(self, mu, cmap, output):
+        import fractals.serial as serial
+        serial.fetch_iter_color_serial(mu, cmap, output)
+
+class AOTBackend(Backend):
+    """Single-threaded kernels compiled ahead of time (fractals.aot, no numba needed at runtime)"""
+    name = 'aot'
+
+    def available(self):
+        return aot.available()
+
+    def mandelbrot(self, Z, max_iter, esc_radius_sq, m_output, ms_output):
+        aot.mandelbrot(Z, max_iter, esc_radius_sq, m_output, ms_output)
+
+    def julia(self, Z, C, max_iter, esc_radius_sq, m_output, ms_output):
+        aot.julia(Z, C, max_iter, esc_radius_sq, m_output, ms_output)
+
+    def mandelbrot_distance(self, Z, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+        if not aot.has_kernel('mandelbrot_de'): # extension was built before the distance kernels existed
+            return BACKENDS['numpy'].mandelbrot_distance(Z, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output)
+        aot.mandelbrot_distance(Z, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output)
+
+    def julia_distance(self, Z, C, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+        if not aot.has_kernel('julia_de'):
+            return BACKENDS['numpy'].julia_distance(Z, C, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output)
+        aot.julia_distance(Z, C, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output)
+
+    def fetch_iter_color(self, mu, cmap, output):
+        aot.fetch_iter_color(mu, cmap, output)
+
+class NumpyBackend(Backend):
+    """Vectorized pure numpy implementation that only iterates the points that have not escaped yet"""
+    name = 'numpy'
+
+    def escape_time(self, z, c, max_iter, esc_radius_sq, m_output, ms_output, m_offset):
+        """Iterate z = z^2 + c and write iteration counts into m_output, ms_output (same values as fractals.gufunc)
+
+        Args
+        ----
+        z: np.array
+            flat complex128 array with the start values (modified in place)
+        c: np.array or complex
+            flat complex128 array (Mandelbrot) or constant (Julia) that is added in each iteration
+        m_offset: int
+            offset added to the iteration index of escaped points (0 for the Mandelbrot set, 1 for Julia sets)
+        """
+        m_output.fill(max_iter)
+        ms_output.fill(0)
+        active = np.arange(z.size) # flat indices of points that have not escaped yet
+        for i in range(max_iter):
+            np.multiply(z, z, out = z)
+            np.add(z, c, out = z)
+            abs_sq = z.real * z.real + z.imag * z.imag
+            escaped = abs_sq > esc_radius_sq
+            if escaped.any():
+                escaped_idx = active[escaped]
+                m_output.flat[escaped_idx] = i + m_offset
+                ms_output.flat[escaped_idx] = i + m_offset + 2 - np.log(np.log(abs_sq[escaped])) / math.log(2)
+                # continue only with the points that are still active
+                still_active = ~escaped
+                z, active = z[still_active], active[still_active]
+                if isinstance(c, np.ndarray):
+                    c = c[still_active]
+                if active.size == 0:
+                    break
+
+    def mandelbrot(self, Z, max_iter, esc_radius_sq, m_output, ms_output):
+        c = Z.ravel()
+        self.escape_time(np.zeros_like(c), c, max_iter, esc_radius_sq, m_output, ms_output, 0)
+
+    def julia(self, Z, C, max_iter, esc_radius_sq, m_output, ms_output):
+        self.escape_time(Z.flatten(), complex(C), max_iter, esc_radius_sq, m_output, ms_output, 1)
+
+    def escape_distance(self, z, c, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output, m_offset):
+        """Same as escape_time, but also iterate the derivative and write the distance estimate into d_output
+
+        Same values as fractals.serial.mandelbrot_de_gu (c is an array) / julia_de_gu (c is a constant).
+        """
+        from fractals.serial import DE_ESC_RADIUS_SQ, INTERIOR_EPS_SQ
+        m_output.fill(max_iter)
+        ms_output.fill(0)
+        d_output.fill(-1)
+        is_mandelbrot = isinstance(c, np.ndarray)
+        dz = np.zeros_like(z) if is_mandelbrot else np.ones_like(z) # dz/dc (Mandelbrot) or dz/dz0 (Julia)
+        multiplier = np.ones_like(z) # product of 2 z_k (equal to dz for Julia sets)
+        escaped = np.zeros(z.size, dtype = bool)
+        active = np.arange(z.size)
+        with np.errstate(over = 'ignore', invalid = 'ignore'): # derivatives of points on the boundary overflow
+            for i in itertools.count():
+                if i >= max_iter: # only escaped points are iterated on until they reach DE_ESC_RADIUS_SQ
+                    keep = escaped
+                    z, dz, multiplier, active, escaped = z[keep], dz[keep], multiplier[keep], active[keep], escaped[keep]
+                    if is_mandelbrot:
+                        c = c[keep]
+                if active.size == 0:
+                    break
+                dz = 2 * z * dz + (1 if is_mandelbrot else 0)
+                z = z * z + c
+                abs_sq = z.real * z.real + z.imag * z.imag
+                new = ~escaped & (abs_sq > esc_radius_sq)
+                if new.any():
+                    new_idx = active[new]
+                    m_output.flat[new_idx] = i + m_offset
+                    ms_output.flat[new_idx] = i + m_offset + 2 - np.log(np.log(abs_sq[new])) / math.log(2)
+                    escaped |= new
+                distance = 0.5 * np.sqrt(abs_sq / (dz.real * dz.real + dz.imag * dz.imag)) * np.log(abs_sq)
+                finished = (new & (distance > far_distance)) | (escaped & (abs_sq > DE_ESC_RADIUS_SQ))
+                d_output.flat[active[finished]] = distance[finished]
+                if is_mandelbrot:
+                    multiplier = np.where(escaped, multiplier, 2 * multiplier * z)
+                else:
+                    multiplier = dz
+                interior = ~escaped & (multiplier.real * multiplier.real + multiplier.imag * multiplier.imag < INTERIOR_EPS_SQ)
+                # continue only with the points that are still active
+                still_active = ~(finished | interior)
+                z, dz, multiplier, active, escaped = z[still_active], dz[still_active], multiplier[still_active], active[still_active], escaped[still_active]
+                if is_mandelbrot:
+                    c = c[still_active]
+
+    def mandelbrot_distance(self, Z, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+        c = Z.ravel()
+        self.escape_distance(np.zeros_like(c), c, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output, 0)
+
+    def julia_distance(self, Z, C, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+        self.escape_distance(Z.flatten(), complex(C), max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output, 1)
+
+    def fetch_iter_color(self, mu, cmap, output):
+        np.take(cmap.astype(np.uint8), mu, axis = 0, out = output, mode = 'clip')
+
+def _calc_tile(backend_name, method, Z, args, m_dtype, n_outputs):
+    """Calculate one tile in a worker process
+
+    Args
+    ----
+    method: str
+        name of backend method (e.g. 'mandelbrot'), called with Z, args and new output buffers
+    n_outputs: int
+        number of output buffers (m followed by float32 buffers)
+
+    Returns
+    -------
+    list of outputs (e.g. simple & smoothed iteration count) of given tile
+    """
+    outputs = [np.empty(Z.shape, dtype = m_dtype)] + [np.empty(Z.shape, dtype = np.float32) for i in range(n_outputs - 1)]
+    getattr(BACKENDS[backend_name], method)(Z, *args, *outputs)
+    return outputs
+
+class TilesBackend(Backend):
+    """Splits the complex plane into horizontal tiles and calculates them in a pool of worker processes"""
+    name = 'multiprocessing-tiles'
+    uses_processes = True
+
+    def __init__(self, workers = None, tiles_per_worker = 4):
+        """Constructor of TilesBackend class instance
+
+        Args
+        ----
+        workers: int
+            number of worker processes (default: number of CPUs)
+        tiles_per_worker: int
+            number of tiles per worker (more tiles balance the load better as some rows take more iterations than others)
+        """
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.tiles_per_worker = tiles_per_worker
+        self.executor = None
+
+    def available(self):
+        return self.workers > 1
+
+    def get_inner(self):
+        """Return the single-threaded backend used inside the workers"""
+        return get_serial_backend()
+
+    def get_executor(self):
+        """Start worker processes on first use ('spawn' as forking a process with running numba threads is unsafe)"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers = self.workers, mp_context = multiprocessing.get_context('spawn'))
+        return self.executor
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def calc_tiles(self, method, Z, args, outputs):
+        """Distribute tiles of Z to worker processes (method of inner backend, see _calc_tile) and copy their results into outputs"""
+        executor, inner = self.get_executor(), self.get_inner()
+        bounds = np.linspace(0, Z.shape[0], min(Z.shape[0], self.workers * self.tiles_per_worker) + 1).astype(int)
+        futures = [(start, stop, executor.submit(_calc_tile, inner.name, method, Z[start:stop], args, outputs[0].dtype,
+                                                 len(outputs))) for start, stop in zip(bounds[:-1], bounds[1:])]
+        for start, stop, future in futures:
+            for output, result in zip(outputs, future.result()):
+                output[start:stop] = result
+
+    def mandelbrot(self, Z, max_iter, esc_radius_sq, m_output, ms_output):
+        self.calc_tiles('mandelbrot', Z, (max_iter, esc_radius_sq), (m_output, ms_output))
+
+    def julia(self, Z, C, max_iter, esc_radius_sq, m_output, ms_output):
+        self.calc_tiles('julia', Z, (C, max_iter, esc_radius_sq), (m_output, ms_output))
+
+    def mandelbrot_distance(self, Z, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+        self.calc_tiles('mandelbrot_distance', Z, (max_iter, esc_radius_sq, far_distance), (m_output, ms_output, d_output))
+
+    def julia_distance(self, Z, C, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+        self.calc_tiles('julia_distance', Z, (C, max_iter, esc_radius_sq, far_distance), (m_output, ms_output, d_output))
+
+    def fetch_iter_color(self, mu, cmap, output):
+        self.get_inner().fetch_iter_color(mu, cmap, output)
+
+# registry of all backends
+BACKENDS = OrderedDict()
+
+def register(backend):
+    """Add backend instance to registry (replaces a backend with the same name)"""
+    BACKENDS[backend.name] = backend
+
+for _backend in (NumbaParallelBackend(), NumbaSerialBackend(), AOTBackend(), NumpyBackend(), TilesBackend()):
+    register(_backend)
+
+_selected = None
+calibration_results = {} # seconds per calibration frame of every backend (None if it failed)
+
+def get_serial_backend():
+    """Return the single-threaded backend for worker processes (the one that is fastest to import first)"""
+    for name in ('aot', 'numba-serial', 'numpy'):
+        if BACKENDS[name].available():
+            return BACKENDS[name]
+
+def available_backends():
+    """Return names of all backends that can be used on this machine"""
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+def select_backend(name):
+    """Use backend with given name for all following calculations"""
+    global _selected
+    if name not in BACKENDS:
+        raise ValueError('unknown backend {!r} (choose from {})'.format(name, ', '.join(BACKENDS)))
+    if _selected is not None and _selected is not BACKENDS[name]:
+        _selected.shutdown() # e.g. do not keep worker processes of a backend that is no longer used
+    _selected = BACKENDS[name]
+
+def get_backend(name = None):
+    """Return backend with given name or the backend that is currently used
+
+    Without a name, the backend is (in this order) the one chosen with select_backend / calibrate, the one set in the
+    environment variable FRACTALS_BACKEND, the fastest single-threaded backend (see get_serial_backend) while the
+    warm-up thread loads and calibrates the parallel kernels, or the numba-parallel backend (numpy backend if numba is
+    not installed). Frames never wait for the warm-up, and the parallel kernels are never launched from two threads at
+    once (numba's workqueue threading layer, used if neither TBB nor OpenMP is installed, aborts the process then).
+    """
+    if name is not None:
+        return BACKENDS[name]
+    if _selected is None and os.environ.get(ENV_VAR):
+        select_backend(os.environ[ENV_VAR])
+    if _selected is not None:
+        return _selected
+    if warmup.is_running():
+        return get_serial_backend()
+    return BACKENDS['numba-parallel'] if BACKENDS['numba-parallel'].available() else BACKENDS['numpy']
+
+def calibrate(width = 480, height = 360, max_iter = 200, repeats = 2):
+    """Benchmark all available backends on a small Mandelbrot and Julia frame and select the fastest one
+
+    The choice of the user (FRACTALS_BACKEND or select_backend) is kept; backends that raise an error are skipped.
+    Backends with a process pool (multiprocessing-tiles) are not benchmarked, as starting the pool takes longer than
+    the whole calibration; they are only used if chosen explicitly. Frames rendered in the meantime use a single-threaded
+    backend (see get_backend), so they compete for at most one core with the calibration.
+
+    Args
+    ----
+    width, height, max_iter: int
+        resolution and maximum number of iterations of the calibration frames
+    repeats: int
+        number of timed runs per backend (after one untimed run that compiles kernels / starts workers)
+
+    Returns
+    -------
+    calibration_results: dict
+        best time in seconds of every available backend (None if it failed)
+    """
+    Z = np.empty((height, width), dtype = np.complex128)
+    Z.real[:] = np.linspace(-2.5, 1.5, width)
+    Z.imag[:] = np.linspace(2, -2, height)[:, np.newaxis]
+    m, ms = np.empty(Z.shape, dtype = np.uint16), np.empty(Z.shape, dtype = np.float32)
+    for name in available_backends():
+        backend = BACKENDS[name]
+        if backend.uses_processes:
+            continue
+        try:
+            timings = []
+            for i in range(repeats + 1):
+                t_start = time.perf_counter()
+                backend.mandelbrot(Z, max_iter, 100.0, m, ms)
+                backend.julia(Z, -0.8 + 0.156j, max_iter, 10.0, m, ms)
+                timings.append(time.perf_counter() - t_start)
+            calibration_results[name] = min(timings[1:])
+        except Exception:
+            calibration_results[name] = None
+    timed = {name: t for name, t in calibration_results.items() if t is not None}
+    if _selected is None and not os.environ.get(ENV_VAR) and timed:
+        select_backend(min(timed, key = timed.get))
+    return calibration_results
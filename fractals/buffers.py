@@ -0,0 +1,76 @@
+# import statements
+from collections import OrderedDict
+import numpy as np
+
+def iter_dtype(max_value):
+    """Return the smallest unsigned integer dtype that can hold every value in [0, max_value]
+
+    Args
+    ----
+    max_value: int
+        largest value that needs to be stored (e.g. max_iter for iteration counts or number of colors for color ids)
+
+    Returns
+    -------
+    np.uint16 or np.uint32
+    """
+    if max_value <= np.iinfo(np.uint16).max:
+        return np.uint16
+    return np.uint32
+
+class BufferPool(object):
+    """Stores preallocated numpy arrays per resolution so that they can be reused across frames and fractals"""
+    def __init__(self, max_resolutions = 2):
+        """Constructor of BufferPool class instance
+
+        Args
+        ----
+        max_resolutions: int
+            number of resolutions we keep buffers for (least recently used resolutions are dropped first)
+        """
+        self.max_resolutions = max_resolutions
+        self.buffers = OrderedDict()
+
+    def get(self, name, shape, dtype):
+        """Fetch buffer with given name for given shape (allocate it only if it does not exist yet)
+
+        Note: the returned array is shared, its content is only valid until the next fractal with the same resolution is calculated
+
+        Args
+        ----
+        name: str
+            name of buffer (e.g. 'm', 'ms', 'rgb')
+        shape: tuple of int
+            shape of buffer, the first two entries are the resolution (height, width) the buffer is pooled under
+        dtype: numpy dtype
+            desired dtype of buffer
+
+        Returns
+        -------
+        buffer: np.array
+            uninitialised array of given shape and dtype
+        """
+        shape = tuple(shape)
+        resolution = shape[:2]
+        if resolution not in self.buffers:
+            self.buffers[resolution] = {}
+            while len(self.buffers) > self.max_resolutions: # drop least recently used resolution
+                self.buffers.popitem(last = False)
+        self.buffers.move_to_end(resolution)
+        pool = self.buffers[resolution]
+        buffer = pool.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype = dtype)
+            pool[name] = buffer
+        return buffer
+
+    def nbytes(self):
+        """Return total amount of bytes currently held by the pool"""
+        return sum(buffer.nbytes for pool in self.buffers.values() for buffer in pool.values())
+
+    def clear(self):
+        """Drop all buffers"""
+        self.buffers.clear()
+
+# default pool shared by all fractals (e.g. by the Mandelbrot and Julia pane)
+default_pool = BufferPool()
@@ -1,13 +1,16 @@
 # import own .py files
-import fractals.gufunc as gufunc
+from fractals.backends import get_backend
+from fractals.buffers import default_pool, iter_dtype
+from fractals.profiler import profiler
 
 # import statements
 import numpy as np
-from scipy.interpolate import pchip_interpolate, Akima1DInterpolator, interp1d
+
+DE_FAR_FACTOR = 4 # points farther than DE_FAR_FACTOR * de_threshold from the boundary stop early in the distance rendering mode
 
 class Fractal(object): 
 
-    def __init__(self, width, height, max_iter, xlim, ylim, esc_radius_sq = 100.0):
+    def __init__(self, width, height, max_iter, xlim, ylim, esc_radius_sq = 100.0, buffers = None, window = None):
         """
         Constructor method of Fractal class
 
@@ -21,6 +24,11 @@ class Fractal(object):
             lower and upper limit on x- and y-axis
         esc_radius_sq: int
             squared escape radius (if |z|^2 = Z_real^2 + Z_i^2 becomes greater than the squared escape radius, we assume that it has escaped)
+        buffers: class instance of BufferPool
+            pool of preallocated arrays that calc / color_fractal write into (default: pool shared by all fractals)
+        window: tuple containing 4 int
+            row, col, full_height, full_width: only calculate the width x height points starting at row, col of the
+            full_height x full_width grid spanned by xlim, ylim (tiles of a larger image get exactly the same points)
         """
         self.width = width
         self.height = height
@@ -28,6 +36,9 @@ class Fractal(object):
         self.xlim = xlim
         self.ylim = ylim
         self.esc_radius_sq= esc_radius_sq
+        self.buffers = buffers if buffers is not None else default_pool
+        self.window = window
+        self.de_threshold = 1.0 # distance to the boundary (in pixels) below which points are darkened in the distance rendering mode
 
     def get_grid(self):
         """Create coordinate grid based on xlim, ylim
@@ -41,7 +52,70 @@ class Fractal(object):
         xx, yy = np.meshgrid(x, y)
         # return flipped xx, yy coordinates to plot fractal correctly in pygame (pygame starts with (0,0) in top right)
         return np.flip(xx, axis = 0), np.flip(yy, axis = 0)
-        
+
+    def get_plane(self):
+        """Write complex plane Z based on xlim, ylim into pooled buffer (same values as xx + yy*1j of get_grid without temporary arrays)
+
+        Returns
+        -------
+        Z: np.array
+            complex plane in pygame coordinates (shared buffer, only valid until the next fractal of same resolution is calculated)
+        """
+        Z = self.buffers.get('Z', (self.height, self.width), np.complex128)
+        row, col, full_height, full_width = self.window if self.window is not None else (0, 0, self.height, self.width)
+        Z.real[:] = np.linspace(self.xlim[0], self.xlim[1], full_width)[col:col + self.width]
+        # flip y-axis to plot fractal correctly in pygame (pygame starts with (0,0) in top left)
+        Z.imag[:] = np.linspace(self.ylim[0], self.ylim[1], full_height)[::-1][row:row + self.height, np.newaxis]
+        return Z
+
+    def get_iter_buffers(self):
+        """Fetch pooled buffers for simple & smoothed iteration count (uint16 / uint32 depending on max_iter and float32)
+
+        Returns
+        -------
+        m, ms: np.array
+            uninitialised buffers of shape (height, width)
+        """
+        shape = (self.height, self.width)
+        m = self.buffers.get('m', shape, iter_dtype(self.max_iter))
+        ms = self.buffers.get('ms', shape, np.float32)
+        return m, ms
+
+    def get_pixel_size(self):
+        """Return distance between two neighbouring points on the x-axis of the complex plane"""
+        full_width = self.window[3] if self.window is not None else self.width
+        return (self.xlim[1] - self.xlim[0]) / max(full_width - 1, 1)
+
+    def get_distance_buffers(self):
+        """Fetch pooled buffers for simple & smoothed iteration count and distance estimate (see get_iter_buffers)"""
+        m, ms = self.get_iter_buffers()
+        return m, ms, self.buffers.get('d', (self.height, self.width), np.float32)
+
+    def calc_distance(self):
+        """
+        generates fractal together with the distance of every point to its boundary (distance rendering mode)
+
+        Points farther than DE_FAR_FACTOR * de_threshold pixels from the boundary and interior points stop early, which
+        makes thin filaments visible at a lower max_iter than with the escape time alone
+
+        Returns
+        -------
+        m, ms: np.array
+            simple & smoothed iteration count (same values as calc)
+        d: np.array
+            estimated distance to the boundary in pixels (only accurate up to DE_FAR_FACTOR * de_threshold; negative for points that did not escape)
+        (all are pooled buffers that are overwritten by the next calculation with the same resolution)
+        """
+        with profiler.stage('grid'):
+            Z = self.get_plane()
+            m, ms, d = self.get_distance_buffers()
+            pixel_size = self.get_pixel_size()
+        with profiler.stage('iterate'):
+            self.calc_distance_backend(get_backend(), Z, DE_FAR_FACTOR * self.de_threshold * pixel_size, m, ms, d)
+            np.multiply(d, 1 / pixel_size, out = d)
+        profiler.add_iterations(m)
+
+        return m, ms, d
 
     def get_coord(self, point):
         """transform pygame coordinates (point) to fractal coordinates on complex plane
@@ -56,12 +130,26 @@ class Fractal(object):
         """
         # decompose given tuple
         pg_x, pg_y = point[0], point[1]
-        # get complex grid of fractal
-        xx, yy = self.get_grid()
-        # return transformed coordinates
-        return xx[pg_y][pg_x], yy[pg_y][pg_x]
+        # same values as the grid of get_grid (without building it; called for every hover event)
+        x, y = np.linspace(self.xlim[0], self.xlim[1], self.width), np.linspace(self.ylim[0], self.ylim[1], self.height)
+        # return transformed coordinates (rows are flipped as pygame starts with (0,0) in top left)
+        return x[pg_x], y[::-1][pg_y]
+
+    def render(self, cmap_id, unique_colors, interpolation_method, color_norm):
+        """calculate and color fractal (distance rendering mode if color_norm == 2, see color_fractal)
 
-    def color_fractal(self, m, ms, cmap_id, unique_colors, interpolation_method, color_norm):
+        Returns
+        -------
+        mu_rgb: np.array (pooled buffer, only valid until the next call)
+        """
+        if color_norm == 2:
+            m, ms, d = self.calc_distance()
+        else:
+            m, ms = self.calc()
+            d = None
+        return self.color_fractal(m, ms, cmap_id, unique_colors, interpolation_method, color_norm, d)
+
+    def color_fractal(self, m, ms, cmap_id, unique_colors, interpolation_method, color_norm, d = None):
         """
         assign every point of fractal a color (RGB color space) 
 
@@ -86,6 +174,9 @@ class Fractal(object):
             id of desired interpolation method
         color_norm: integer
             id of desired normalization method to choose whether we color the fractal based on m (simple iteration count) or ms (smoothed iteration count)
+            (2: like ms, but darkened towards the boundary based on d)
+        d: np.array
+            distance estimate in pixels from calc_distance (only needed for color_norm 2)
         
         Returns
         -------
@@ -93,17 +184,36 @@ class Fractal(object):
             contains RGB color for every single point we evaluated on the complex plane
         """
         # create color map
-        x_obs, y_obs, color_max = self.get_cmap(cmap_id)
-        cmap, fact_upperbound = self.interpolate_cmap(unique_colors, interpolation_method, x_obs, y_obs)
-
-        if color_norm == 0: # choose color with simple iteration count
-            mu = np.mod(m, len(cmap))
-        elif color_norm == 1: # choose color with smoothed iteration count
-            mu = (ms * fact_upperbound).astype(int) % len(cmap)
-
-        # replace every element in mu with the rgb values from our cmap
-        mu_rgb = self.fetch_iter_color(mu, cmap)
-        mu_rgb[m == self.max_iter] = color_max
+        with profiler.stage('palette'):
+            x_obs, y_obs, color_max = self.get_cmap(cmap_id)
+            cmap, fact_upperbound = self.interpolate_cmap(unique_colors, interpolation_method, x_obs, y_obs)
+
+        with profiler.stage('color lookup'):
+            # color ids are written into pooled buffers (no new arrays per frame)
+            mu = self.buffers.get('mu', m.shape, iter_dtype(len(cmap)))
+            if color_norm == 0: # choose color with simple iteration count
+                np.mod(m, len(cmap), out = mu, casting = 'unsafe')
+            elif color_norm in (1, 2): # choose color with smoothed iteration count
+                ms_scaled = self.buffers.get('ms_scaled', m.shape, np.float32)
+                np.multiply(ms, fact_upperbound, out = ms_scaled, casting = 'unsafe')
+                np.trunc(ms_scaled, out = ms_scaled)
+                np.mod(ms_scaled, len(cmap), out = ms_scaled)
+                np.copyto(mu, ms_scaled, casting = 'unsafe')
+            else: # mu would stay uninitialised and be used as indices into cmap
+                raise ValueError('color_norm must be 0, 1 or 2, got {}'.format(color_norm))
+
+            # replace every element in mu with the rgb values from our cmap
+            mu_rgb = self.fetch_iter_color(mu, cmap)
+            never_escaped = self.buffers.get('never_escaped', m.shape, np.bool_)
+            np.equal(m, self.max_iter, out = never_escaped)
+            if color_norm == 2: # darken points closer than de_threshold pixels to the boundary (filaments become crisp lines)
+                if d is None:
+                    raise ValueError('color_norm 2 needs the distance estimate d of calc_distance')
+                shade = self.buffers.get('shade', m.shape, np.float32)
+                np.multiply(d, 1 / self.de_threshold, out = shade)
+                np.clip(shade, 0, 1, out = shade)
+                np.multiply(mu_rgb, shade[:, :, np.newaxis], out = mu_rgb, casting = 'unsafe')
+            mu_rgb[never_escaped] = color_max
 
         return mu_rgb
 
@@ -194,6 +304,7 @@ class Fractal(object):
         fact_upperbound: integer
             upperbound of chosen colorspace
         """
+        from scipy.interpolate import pchip_interpolate, Akima1DInterpolator, interp1d # imported lazily (slow import)
         # create interpolated x-axis
         x = np.linspace(min(x_obs), max(x_obs), unique_colors)
         # choose interpolation method
@@ -229,9 +340,10 @@ class Fractal(object):
         Returns
         -------
         mu_rgb: np.array
-            contains RGB color for every single point we evaluated on the complex plane (values that never escape are not correctly colored yet)
+            contains RGB color (uint8) for every single point we evaluated on the complex plane (values that never escape are not correctly colored yet)
         """
-        mu_rgb = gufunc.fetch_iter_color_numpy_gu(mu, cmap)
+        mu_rgb = self.buffers.get('rgb', mu.shape + (3,), np.uint8)
+        get_backend().fetch_iter_color(mu, cmap, mu_rgb)
         return mu_rgb
 
     def zoom(self, point, zoom_factor):
@@ -254,8 +366,8 @@ class Fractal(object):
 
 class Mandelbrot(Fractal):
 
-    def __init__(self, width, height, max_iter, esc_radius_sq = 100.0, xlim = np.array([-2.5, 1.5]), ylim = np.array([-2, 2])):
-        super().__init__(width, height, max_iter, esc_radius_sq = esc_radius_sq, xlim = xlim, ylim = ylim)
+    def __init__(self, width, height, max_iter, esc_radius_sq = 100.0, xlim = np.array([-2.5, 1.5]), ylim = np.array([-2, 2]), buffers = None, window = None):
+        super().__init__(width, height, max_iter, esc_radius_sq = esc_radius_sq, xlim = xlim, ylim = ylim, buffers = buffers, window = window)
 
     def calc(self):
         """
@@ -267,20 +379,27 @@ class Mandelbrot(Fractal):
             number of iterations when point x_{i}, y_{j} escaped or reached max_iter (simple iteration count)
         ms: np.array
             fractionalised number of iterations when point x_{i}, y_{j} escaped or reached max_iter (smoothed iteration count)
+        (both are pooled buffers that are overwritten by the next calculation with the same resolution)
         """
-        # set up grid
-        xx, yy = self.get_grid()
-        # create complex plane Z
-        Z = xx + yy*1j
+        # set up complex plane Z and output buffers
+        with profiler.stage('grid'):
+            Z = self.get_plane()
+            m, ms = self.get_iter_buffers()
         # calculate iterations (in each iteration, square every point on complex plane C and add it again)
-        m, ms = gufunc.mandelbrot_numpy_gu(Z, self.max_iter, self.esc_radius_sq)
+        with profiler.stage('iterate'):
+            get_backend().mandelbrot(Z, self.max_iter, self.esc_radius_sq, m, ms)
+        profiler.add_iterations(m)
 
         return m, ms
 
+    def calc_distance_backend(self, backend, Z, far_distance, m, ms, d):
+        """Calculate iteration counts & distance estimate (dz/dc) with given backend (see Fractal.calc_distance)"""
+        backend.mandelbrot_distance(Z, self.max_iter, self.esc_radius_sq, far_distance, m, ms, d)
+
 class JuliaSet(Fractal):
 
-    def __init__(self, width, height, max_iter, C = 0 + 0*1j, esc_radius_sq= 10.0, xlim = np.array([-2, 2]), ylim = np.array([-2, 2])):
-        super().__init__(width, height, max_iter, esc_radius_sq = esc_radius_sq , xlim=xlim, ylim=ylim)
+    def __init__(self, width, height, max_iter, C = 0 + 0*1j, esc_radius_sq= 10.0, xlim = np.array([-2, 2]), ylim = np.array([-2, 2]), buffers = None, window = None):
+        super().__init__(width, height, max_iter, esc_radius_sq = esc_radius_sq , xlim=xlim, ylim=ylim, buffers = buffers, window = window)
         self.C = C # constant point C for which we want to calculate the Julia set
 
     def calc(self):
@@ -293,12 +412,19 @@ class JuliaSet(Fractal):
             number of iterations when point x_{i}, y_{j} escaped or reached max_iter (simple iteration count)
         ms: np.array
             fractionalised number of iterations when point x_{i}, y_{j} escaped or reached max_iter (smoothed iteration count)
+        (both are pooled buffers that are overwritten by the next calculation with the same resolution)
         """
-        # set up grid
-        xx, yy = self.get_grid()
-        # create complex plane Z 
-        Z = xx + yy * 1j
+        # set up complex plane Z and output buffers
+        with profiler.stage('grid'):
+            Z = self.get_plane()
+            m, ms = self.get_iter_buffers()
         # calculate iterations (in each iteration, add add chosen C (complex constant) to the square of every single point on complex plane Z)
-        m, ms = gufunc.julia_numpy_gu(Z, self.C, self.max_iter, self.esc_radius_sq)
+        with profiler.stage('iterate'):
+            get_backend().julia(Z, self.C, self.max_iter, self.esc_radius_sq, m, ms)
+        profiler.add_iterations(m)
+
+        return m, ms
 
-        return m, ms
\ No newline at end of file
+    def calc_distance_backend(self, backend, Z, far_distance, m, ms, d):
+        """Calculate iteration counts & distance estimate (dz/dz0) with given backend (see Fractal.calc_distance)"""
+        backend.julia_distance(Z, self.C, self.max_iter, self.esc_radius_sq, far_distance, m, ms, d)
\ No newline at end of file
@@ -1,42 +1,19 @@
 # import statements
-import math
-import numba
-from numba import jit, guvectorize, float64, int64, complex128
+# all kernels are cached on disk (__pycache__), so only the very first import has to compile them
+from numba import guvectorize, float32, float64, int64, uint8, uint16, uint32, complex128
 
-# functions to calculate mandelbrot set
-@jit(numba.typeof((42, 0.))(complex128, int64, float64))
-def mandelbrot_gu(z, max_iter, esc_radius_sq):
-    """compute all mandelbrot iterations for a given point on the complex plane of the fractal
-    
-    Args
-    ----
-    z: complex128
-        current point on complex plane for which we evaluate its simple & smoothed iteration count
-    max_iter: int
-        maximum number of iterations to be computed for each point
-    esc_radius_sq: int
-        squared escape radius (if |z|^2 = Z_real^2 + Z_i^2 becomes greater than the squared escape radius, we assume that it has escaped)
+# import own .py files
+from fractals.serial import mandelbrot_gu, julia_gu, mandelbrot_de_gu, julia_de_gu
 
-    Returns
-    -------
-    tuple containing the simple and smoothed iteration count for the given point z
-    """
-    mreal = 0
-    real = 0
-    imag = 0
-    for m in range(max_iter):
-        mreal = real*real - imag*imag + z.real
-        imag = 2* real*imag + z.imag
-        real = mreal
-        if real * real + imag * imag > esc_radius_sq: # if value escapes before reaching max_iter
-            return (m, m + 2 - math.log(math.log(real * real + imag * imag))/math.log(2))
-        if m == max_iter - 1: # if value does not escape before reaching max_iter
-            return (max_iter, 0)
-    return (0, 0)
-
-@guvectorize([(complex128[:], int64[:], float64[:], int64[:], float64[:])], '(n),(),()->(n),(n)',target='parallel')
+# functions to calculate mandelbrot set
+@guvectorize([(complex128[:], int64[:], float64[:], int64[:], float64[:]),
+              (complex128[:], int64[:], float64[:], uint16[:], float32[:]),
+              (complex128[:], int64[:], float64[:], uint32[:], float32[:])], '(n),(),()->(n),(n)',target='parallel', cache=True)
 def mandelbrot_numpy_gu(Z, max_iter, esc_radius_sq, m_output, ms_output):
     """Vectorizes the mandelbrot calculation and runs it multithreaded
+
+    m_output and ms_output can be passed in preallocated (uint16 / uint32 and float32 for compact buffers); as numpy picks the first
+    matching loop, pass the full signature as well (e.g. signature = (Z.dtype, np.int64, np.float64, m.dtype, ms.dtype))
     
     Args
     ----
@@ -60,41 +37,13 @@ def mandelbrot_numpy_gu(Z, max_iter, esc_radius_sq, m_output, ms_output):
         m_output[i], ms_output[i] = mandelbrot_gu(Z[i],max_iter, esc_radius_sq)
 
 # functions to calculate julia set
-@jit(numba.typeof((42, 0.))(complex128, complex128, int64, float64))
-def julia_gu(z, c, max_iter, esc_radius_sq):
-    """compute all julia iterations for a given point on the complex plane of the fractal
-    
-    Args
-    ----
-    z: complex128
-        current point on complex plane for which we evaluate its simple & smoothed iteration count
-    c: complex 128
-        chosen constant complex value with which we will evaluate z
-    max_iter: int
-        maximum number of iterations to be computed for each point
-    esc_radius_sq: int
-        squared escape radius (if |z|^2 = Z_real^2 + Z_i^2 becomes greater than the squared escape radius, we assume that it has escaped)
-
-    Returns
-    -------
-    tuple containing the simple and smoothed iteration count for the given point z
-    """
-    mreal = 0
-    real = z.real
-    imag = z.imag
-    for m in range(max_iter):
-        mreal = real*real - imag*imag + c.real
-        imag = 2* real*imag + c.imag
-        real = mreal
-        if real * real + imag * imag > esc_radius_sq: # if value escapes before reaching max_iter
-            return (m + 1, m + 3 - math.log(math.log(real * real + imag * imag))/math.log(2))
-        if m == max_iter - 1: # if value does not escape before reaching max_iter
-            return (max_iter, 0)
-    return (0, 0)
-
-@guvectorize([(complex128[:], complex128[:], int64[:], float64[:], int64[:], float64[:])], '(n),(),(),()->(n),(n)',target='parallel')
+@guvectorize([(complex128[:], complex128[:], int64[:], float64[:], int64[:], float64[:]),
+              (complex128[:], complex128[:], int64[:], float64[:], uint16[:], float32[:]),
+              (complex128[:], complex128[:], int64[:], float64[:], uint32[:], float32[:])], '(n),(),(),()->(n),(n)',target='parallel', cache=True)
 def julia_numpy_gu(Z, C, max_iter, esc_radius_sq, m_output, ms_output):
     """Vectorizes the Julia set calculation and runs it multithreaded
+
+    m_output and ms_output can be passed in preallocated (see mandelbrot_numpy_gu)
     
     Args
     ----
@@ -120,10 +69,44 @@ def julia_numpy_gu(Z, C, max_iter, esc_radius_sq, m_output, ms_output):
     for i in range(Z.shape[0]):
         m_output[i], ms_output[i] = julia_gu(Z[i], C, max_iter, esc_radius_sq)
 
+# functions to calculate exterior distance estimates (distance rendering mode)
+@guvectorize([(complex128[:], int64[:], float64[:], float64[:], uint16[:], float32[:], float32[:]),
+              (complex128[:], int64[:], float64[:], float64[:], uint32[:], float32[:], float32[:])], '(n),(),(),()->(n),(n),(n)',target='parallel', cache=True)
+def mandelbrot_de_numpy_gu(Z, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+    """Vectorizes the mandelbrot distance estimation and runs it multithreaded (outputs preallocated, see mandelbrot_numpy_gu)
+
+    Returns
+    -------
+    m_output, ms_output: np.array
+        simple & smoothed iteration count (see mandelbrot_numpy_gu)
+    d_output: np.array
+        exterior distance estimate of every point (-1 for points that did not escape)
+    """
+    max_iter = max_iter[0]
+    esc_radius_sq = esc_radius_sq[0]
+    far_distance = far_distance[0]
+    for i in range(Z.shape[0]):
+        m_output[i], ms_output[i], d_output[i] = mandelbrot_de_gu(Z[i], max_iter, esc_radius_sq, far_distance)
+
+@guvectorize([(complex128[:], complex128[:], int64[:], float64[:], float64[:], uint16[:], float32[:], float32[:]),
+              (complex128[:], complex128[:], int64[:], float64[:], float64[:], uint32[:], float32[:], float32[:])], '(n),(),(),(),()->(n),(n),(n)',target='parallel', cache=True)
+def julia_de_numpy_gu(Z, C, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+    """Vectorizes the Julia set distance estimation and runs it multithreaded (see mandelbrot_de_numpy_gu)"""
+    max_iter = max_iter[0]
+    esc_radius_sq = esc_radius_sq[0]
+    far_distance = far_distance[0]
+    C = C[0]
+    for i in range(Z.shape[0]):
+        m_output[i], ms_output[i], d_output[i] = julia_de_gu(Z[i], C, max_iter, esc_radius_sq, far_distance)
+
 # function to color fractal
-@guvectorize([(int64[:,:], int64[:,:], float64[:,:,:])], '(m,n),(i,j)->(m,n,j)',target='parallel')
+@guvectorize([(int64[:,:], int64[:,:], float64[:,:,:]),
+              (uint16[:,:], int64[:,:], uint8[:,:,:]),
+              (uint32[:,:], int64[:,:], uint8[:,:,:])], '(m,n),(i,j)->(m,n,j)',target='parallel', cache=True)
 def fetch_iter_color_numpy_gu(mu, cmap, output):
     """generate new array of shape (m,n,3) that contains the RGB values for all single iteration counts in mu
+
+    output can be passed in preallocated (uint8 for uint16 / uint32 mu, see mandelbrot_numpy_gu)
     
     Args
     ----
@@ -140,4 +123,5 @@ def fetch_iter_color_numpy_gu(mu, cmap, output):
     for i in range(mu.shape[0]): # iterate through rows in mu
         for j in range(mu.shape[1]): # iterate through columns in mu
             cur_mu = mu[i][j]
-            output[i][j] = cmap[cur_mu]
\ No newline at end of file
+            output[i][j] = cmap[cur_mu]
+
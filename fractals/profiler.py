@@ -0,0 +1,141 @@
+"""Optional timing of the stages of every rendered frame
+
+Enable it with the environment variable FRACTALS_PROFILE=1 (or by pressing 'p' in the pygame window). While disabled,
+frame() and stage() do nothing. The recorded frames can be exported with export_trace as a Chrome trace (open it in
+chrome://tracing or https://ui.perfetto.dev).
+"""
+# import statements
+import json
+import os
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+class Profiler(object):
+    """Records duration of every stage, pixels / iterations per second and allocated bytes of every frame"""
+    def __init__(self, enabled = False, max_frames = 10000):
+        """Constructor of Profiler class instance
+
+        Args
+        ----
+        enabled: boolean
+            whether frames are recorded
+        max_frames: int
+            number of most recent frames that are kept for the trace export
+        """
+        self.enabled = False
+        self.frames = deque(maxlen = max_frames)
+        self.current = None
+        self.t_origin = time.perf_counter()
+        self.started_tracemalloc = False
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        """Start recording frames (also starts tracemalloc to measure allocated bytes, which slows down python code a little)"""
+        self.enabled = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+
+    def disable(self):
+        """Stop recording frames"""
+        self.enabled = False
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+    def toggle(self):
+        """Enable profiler if it is disabled and vice versa"""
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    @contextmanager
+    def frame(self, name, pixels):
+        """Record one frame (all stages inside the with-block are attributed to it)
+
+        Args
+        ----
+        name: str
+            name of frame (e.g. name of fractal class)
+        pixels: int
+            number of pixels that are calculated in this frame
+        """
+        if not self.enabled:
+            yield
+            return
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        elif self.started_tracemalloc: # python < 3.9: restarting tracemalloc resets the peak
+            tracemalloc.stop()
+            tracemalloc.start()
+        mem_start = tracemalloc.get_traced_memory()[0]
+        self.current = {'name': name, 'start': time.perf_counter(), 'pixels': pixels, 'iterations': 0, 'stages': []}
+        try:
+            yield
+        finally:
+            frame, self.current = self.current, None
+            frame['duration'] = time.perf_counter() - frame['start']
+            frame['alloc_bytes'] = tracemalloc.get_traced_memory()[1] - mem_start if tracemalloc.is_tracing() else 0
+            self.frames.append(frame)
+
+    @contextmanager
+    def stage(self, name):
+        """Record duration of one stage of the current frame (does nothing outside of frame)"""
+        if self.current is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.current is not None:
+                self.current['stages'].append((name, start, time.perf_counter() - start))
+
+    def add_iterations(self, m):
+        """Add simple iteration counts m of the current frame to its total number of iterations"""
+        if self.current is not None:
+            self.current['iterations'] += int(m.sum(dtype = 'int64'))
+
+    def summary_lines(self):
+        """Return text lines that describe the last frame (e.g. for the on-screen HUD)"""
+        if not self.frames:
+            return ['profiler: no frame recorded yet']
+        frame = self.frames[-1]
+        lines = ['{}: {:.1f} ms'.format(frame['name'], frame['duration'] * 1000)]
+        for name, start, duration in frame['stages']:
+            lines.append('  {}: {:.1f} ms'.format(name, duration * 1000))
+        lines.append('{:.1f} Mpixel/s, {:.0f} Miter/s'.format(frame['pixels'] / frame['duration'] / 1e6,
+                                                             frame['iterations'] / frame['duration'] / 1e6))
+        lines.append('allocated: {:.2f} MB'.format(frame['alloc_bytes'] / 1e6))
+        return lines
+
+    def export_trace(self, path):
+        """Write recorded frames as Chrome trace (JSON) to given path
+
+        Args
+        ----
+        path: str
+            path of JSON file
+        """
+        pid = os.getpid()
+        to_us = lambda t: (t - self.t_origin) * 1e6
+        events = []
+        for frame in self.frames:
+            events.append({'name': frame['name'], 'cat': 'frame', 'ph': 'X', 'pid': pid, 'tid': 0,
+                           'ts': to_us(frame['start']), 'dur': frame['duration'] * 1e6,
+                           'args': {'pixels': frame['pixels'], 'iterations': frame['iterations'],
+                                    'pixels_per_s': frame['pixels'] / frame['duration'],
+                                    'iterations_per_s': frame['iterations'] / frame['duration'],
+                                    'alloc_bytes': frame['alloc_bytes']}})
+            for name, start, duration in frame['stages']:
+                events.append({'name': name, 'cat': 'stage', 'ph': 'X', 'pid': pid, 'tid': 0, 'ts': to_us(start), 'dur': duration * 1e6})
+            events.append({'name': 'alloc_bytes', 'ph': 'C', 'pid': pid, 'ts': to_us(frame['start']), 'args': {'bytes': frame['alloc_bytes']}})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+# profiler shared by fractals and GUI
+profiler = Profiler(enabled = bool(os.environ.get('FRACTALS_PROFILE')))
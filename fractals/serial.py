@@ -0,0 +1,210 @@
+# import statements
+# single-threaded kernels: the point kernels that fractals.gufunc vectorizes and 2D loops over them (numba-serial backend,
+# ahead-of-time build). Kept apart from fractals.gufunc, so worker processes do not load the parallel gufuncs.
+# all kernels are cached on disk (__pycache__), so only the very first import has to compile them
+import math
+import numba
+from numba import jit, float64, int64, complex128
+
+# functions to calculate mandelbrot set
+@jit(numba.typeof((42, 0.))(complex128, int64, float64), cache=True)
+def mandelbrot_gu(z, max_iter, esc_radius_sq):
+    """compute all mandelbrot iterations for a given point on the complex plane of the fractal
+    
+    Args
+    ----
+    z: complex128
+        current point on complex plane for which we evaluate its simple & smoothed iteration count
+    max_iter: int
+        maximum number of iterations to be computed for each point
+    esc_radius_sq: int
+        squared escape radius (if |z|^2 = Z_real^2 + Z_i^2 becomes greater than the squared escape radius, we assume that it has escaped)
+
+    Returns
+    -------
+    tuple containing the simple and smoothed iteration count for the given point z
+    """
+    mreal = 0
+    real = 0
+    imag = 0
+    for m in range(max_iter):
+        mreal = real*real - imag*imag + z.real
+        imag = 2* real*imag + z.imag
+        real = mreal
+        if real * real + imag * imag > esc_radius_sq: # if value escapes before reaching max_iter
+            return (m, m + 2 - math.log(math.log(real * real + imag * imag))/math.log(2))
+        if m == max_iter - 1: # if value does not escape before reaching max_iter
+            return (max_iter, 0)
+    return (0, 0)
+
+# functions to calculate julia set
+@jit(numba.typeof((42, 0.))(complex128, complex128, int64, float64), cache=True)
+def julia_gu(z, c, max_iter, esc_radius_sq):
+    """compute all julia iterations for a given point on the complex plane of the fractal
+    
+    Args
+    ----
+    z: complex128
+        current point on complex plane for which we evaluate its simple & smoothed iteration count
+    c: complex 128
+        chosen constant complex value with which we will evaluate z
+    max_iter: int
+        maximum number of iterations to be computed for each point
+    esc_radius_sq: int
+        squared escape radius (if |z|^2 = Z_real^2 + Z_i^2 becomes greater than the squared escape radius, we assume that it has escaped)
+
+    Returns
+    -------
+    tuple containing the simple and smoothed iteration count for the given point z
+    """
+    mreal = 0
+    real = z.real
+    imag = z.imag
+    for m in range(max_iter):
+        mreal = real*real - imag*imag + c.real
+        imag = 2* real*imag + c.imag
+        real = mreal
+        if real * real + imag * imag > esc_radius_sq: # if value escapes before reaching max_iter
+            return (m + 1, m + 3 - math.log(math.log(real * real + imag * imag))/math.log(2))
+        if m == max_iter - 1: # if value does not escape before reaching max_iter
+            return (max_iter, 0)
+    return (0, 0)
+
+# functions to calculate exterior distance estimates (distance rendering mode)
+DE_ESC_RADIUS_SQ = 1e10 # the distance estimate is only accurate for a large escape radius
+INTERIOR_EPS_SQ = 1e-12 # if |dz_n/dz_1|^2 (orbit multiplier) falls below this, the orbit is attracted by a cycle, i.e. the point is inside
+
+@jit(numba.typeof((42, 0., 0.))(complex128, int64, float64, float64), cache=True)
+def mandelbrot_de_gu(c, max_iter, esc_radius_sq, far_distance):
+    """compute mandelbrot iterations of a point together with the derivative dz/dc and return its exterior distance estimate
+
+    Two kinds of points stop early: points whose rough distance estimate at the normal escape radius already exceeds
+    far_distance (the estimate is only accurate to a factor of about 2 there, so pass a multiple of the distance that
+    matters), and interior points whose orbit multiplier (product of 2 z_k) vanishes.
+
+    Args
+    ----
+    c: complex128
+        current point on complex plane
+    max_iter: int
+        maximum number of iterations to be computed for each point
+    esc_radius_sq: float
+        squared escape radius at which the simple & smoothed iteration count are taken (same values as mandelbrot_gu)
+    far_distance: float
+        distance (in units of the complex plane) beyond which the estimate does not need to be accurate
+
+    Returns
+    -------
+    tuple containing the simple and smoothed iteration count and the distance estimate |z| log|z| / |dz/dc| of the point
+    (distance -1 for points that did not escape)
+    """
+    real = 0.0
+    imag = 0.0
+    dreal = 0.0 # dz/dc
+    dimag = 0.0
+    preal = 1.0 # product of 2 z_k
+    pimag = 0.0
+    escaped = False
+    m = max_iter
+    ms = 0.0
+    n = 0
+    while n < max_iter or escaped: # escaped points are iterated on until they reach DE_ESC_RADIUS_SQ
+        mreal = 2 * (real*dreal - imag*dimag) + 1 # dz/dc = 2 z dz/dc + 1
+        dimag = 2 * (real*dimag + imag*dreal)
+        dreal = mreal
+        mreal = real*real - imag*imag + c.real
+        imag = 2* real*imag + c.imag
+        real = mreal
+        abs_sq = real * real + imag * imag
+        if not escaped:
+            if abs_sq > esc_radius_sq:
+                escaped = True
+                m, ms = n, n + 2 - math.log(math.log(abs_sq))/math.log(2)
+                if 0.5 * math.sqrt(abs_sq / (dreal*dreal + dimag*dimag)) * math.log(abs_sq) > far_distance:
+                    return (m, ms, 0.5 * math.sqrt(abs_sq / (dreal*dreal + dimag*dimag)) * math.log(abs_sq))
+            else:
+                mreal = 2 * (preal*real - pimag*imag)
+                pimag = 2 * (preal*imag + pimag*real)
+                preal = mreal
+                if preal*preal + pimag*pimag < INTERIOR_EPS_SQ:
+                    return (max_iter, 0.0, -1.0)
+        if abs_sq > DE_ESC_RADIUS_SQ:
+            return (m, ms, 0.5 * math.sqrt(abs_sq / (dreal*dreal + dimag*dimag)) * math.log(abs_sq))
+        n += 1
+    return (max_iter, 0.0, -1.0)
+
+@jit(numba.typeof((42, 0., 0.))(complex128, complex128, int64, float64, float64), cache=True)
+def julia_de_gu(z, c, max_iter, esc_radius_sq, far_distance):
+    """compute julia iterations of a point together with the derivative dz/dz0 and return its exterior distance estimate
+
+    Points stop early as in mandelbrot_de_gu (for Julia sets, dz/dz0 itself is the orbit multiplier).
+
+    Returns
+    -------
+    tuple containing the simple and smoothed iteration count (same values as julia_gu) and the distance estimate
+    |z| log|z| / |dz/dz0| of the point (distance -1 for points that did not escape)
+    """
+    real = z.real
+    imag = z.imag
+    dreal = 1.0 # dz/dz0
+    dimag = 0.0
+    escaped = False
+    m = max_iter
+    ms = 0.0
+    n = 0
+    while n < max_iter or escaped: # escaped points are iterated on until they reach DE_ESC_RADIUS_SQ
+        mreal = 2 * (real*dreal - imag*dimag) # dz/dz0 = 2 z dz/dz0
+        dimag = 2 * (real*dimag + imag*dreal)
+        dreal = mreal
+        mreal = real*real - imag*imag + c.real
+        imag = 2* real*imag + c.imag
+        real = mreal
+        abs_sq = real * real + imag * imag
+        if not escaped:
+            if abs_sq > esc_radius_sq:
+                escaped = True
+                m, ms = n + 1, n + 3 - math.log(math.log(abs_sq))/math.log(2)
+                if 0.5 * math.sqrt(abs_sq / (dreal*dreal + dimag*dimag)) * math.log(abs_sq) > far_distance:
+                    return (m, ms, 0.5 * math.sqrt(abs_sq / (dreal*dreal + dimag*dimag)) * math.log(abs_sq))
+            elif dreal*dreal + dimag*dimag < INTERIOR_EPS_SQ:
+                return (max_iter, 0.0, -1.0)
+        if abs_sq > DE_ESC_RADIUS_SQ:
+            return (m, ms, 0.5 * math.sqrt(abs_sq / (dreal*dreal + dimag*dimag)) * math.log(abs_sq))
+        n += 1
+    return (max_iter, 0.0, -1.0)
+
+# single-threaded 2D versions (compiled lazily on first call; used by the numba-serial backend and for the ahead-of-time build)
+@jit(nopython=True, cache=True)
+def mandelbrot_serial(Z, max_iter, esc_radius_sq, m_output, ms_output):
+    """compute simple & smoothed iteration count for every point of 2D complex plane Z single-threaded (writes into m_output, ms_output)"""
+    for i in range(Z.shape[0]):
+        for j in range(Z.shape[1]):
+            m_output[i, j], ms_output[i, j] = mandelbrot_gu(Z[i, j], max_iter, esc_radius_sq)
+
+@jit(nopython=True, cache=True)
+def julia_serial(Z, C, max_iter, esc_radius_sq, m_output, ms_output):
+    """compute simple & smoothed iteration count for every point of 2D complex plane Z single-threaded (writes into m_output, ms_output)"""
+    for i in range(Z.shape[0]):
+        for j in range(Z.shape[1]):
+            m_output[i, j], ms_output[i, j] = julia_gu(Z[i, j], C, max_iter, esc_radius_sq)
+
+@jit(nopython=True, cache=True)
+def fetch_iter_color_serial(mu, cmap, output):
+    """write RGB values for all single iteration counts in mu into output single-threaded"""
+    for i in range(mu.shape[0]):
+        for j in range(mu.shape[1]):
+            output[i, j] = cmap[mu[i, j]]
+
+@jit(nopython=True, cache=True)
+def mandelbrot_de_serial(Z, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+    """compute iteration counts & distance estimate for every point of 2D complex plane Z single-threaded"""
+    for i in range(Z.shape[0]):
+        for j in range(Z.shape[1]):
+            m_output[i, j], ms_output[i, j], d_output[i, j] = mandelbrot_de_gu(Z[i, j], max_iter, esc_radius_sq, far_distance)
+
+@jit(nopython=True, cache=True)
+def julia_de_serial(Z, C, max_iter, esc_radius_sq, far_distance, m_output, ms_output, d_output):
+    """compute iteration counts & distance estimate for every point of 2D complex plane Z single-threaded"""
+    for i in range(Z.shape[0]):
+        for j in range(Z.shape[1]):
+            m_output[i, j], ms_output[i, j], d_output[i, j] = julia_de_gu(Z[i, j], C, max_iter, esc_radius_sq, far_distance)
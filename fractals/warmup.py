@@ -0,0 +1,59 @@
+# import statements
+import importlib.util
+import threading
+
+_started = threading.Event()
+_jit_ready = threading.Event()
+_done = threading.Event()
+
+def _load_jit():
+    """Import the numba kernels (compiles them or loads them from the on-disk cache)"""
+    import fractals.gufunc
+    _jit_ready.set()
+
+def _warm_up(calibrate):
+    """Load the numba kernels and optionally benchmark all backends to select the fastest one"""
+    try:
+        _load_jit()
+        if calibrate:
+            from fractals import backends
+            backends.calibrate()
+    finally:
+        _done.set()
+
+def start(calibrate = False):
+    """Load the numba kernels in a background thread (e.g. while the settings window is open)
+
+    Args
+    ----
+    calibrate: boolean
+        whether to benchmark all available backends afterwards and select the fastest one (see fractals.backends.calibrate)
+
+    Returns
+    -------
+    thread: threading.Thread
+        daemon thread that loads the kernels
+    """
+    if importlib.util.find_spec('numba') is not None:
+        # launch numba's threading layer in the main thread (the TBB layer hangs on exit if it was launched in another thread)
+        import numba
+        numba.get_num_threads()
+    _started.set()
+    thread = threading.Thread(target = _warm_up, args = (calibrate,), name = 'numba-warmup', daemon = True)
+    thread.start()
+    return thread
+
+def is_running():
+    """Return True if the warm-up thread has been started and has not finished yet"""
+    return _started.is_set() and not _done.is_set()
+
+def is_ready():
+    """Return True if the numba kernels are loaded"""
+    return _jit_ready.is_set()
+
+def wait():
+    """Block until the warm-up thread has finished (or load the numba kernels now if it was never started)"""
+    if _started.is_set():
+        _done.wait()
+    else:
+        _load_jit()
@@ -1,9 +1,14 @@
 # import own .py files
-from pygameGUI.GUI import GUI, Button
+from pygameGUI.GUI import GUI, Button, HUD
 from pygameGUI.user_input import UserInput
+from pygameGUI.session import SessionRecorder
+from pygameGUI.prefetch import JuliaPrefetcher, frame_cache, frame_key
 from fractals.fractals import Mandelbrot, JuliaSet
+from fractals import warmup
+from fractals.profiler import profiler
 
 # import external packages
+import os
 import pygame
 
 def fetch_options():
@@ -13,7 +18,7 @@ def fetch_options():
     resolution_options = ['1280x960 (4:3)', '1440x1080 (4:3)', '1920x1440 (4:3)', '1280x720 (16:9)', '1600x900 (16:9)', '1920x1080 (16:9)']
     cmap_options = ['blues, whites & oranges', 'orange, white & blue', 'pink & blue', 'lime', 'aqua & black']
     interpolation_options = ['linear','cubic (akima)','cubic (pchip)']
-    color_norm_options = ['simple iteration count','smoothed iteration count']
+    color_norm_options = ['simple iteration count','smoothed iteration count','distance estimate']
     show_julia_options = ['disabled', 'enabled']
     return label_names, (resolution_options, cmap_options, interpolation_options, color_norm_options, show_julia_options)
 
@@ -58,25 +63,33 @@ def create_buttons(var):
                                 'Instructions: move mouse over Mandelbrot to see corresponding Julia set; zoom as before')
     button_settings_open = Button((255, 255, 255), (255, 0, 0), 0.01*var[0], 0.92*var[1], 0.98*var[0], 50,
                                 'Close settings to continue fractal exploration.')
-    buttons_set_zoom = [button_settings, button_quit, button_zoom_instructions]
-    buttons_set_julia = [button_settings, button_quit, button_julia_instructions]
-    buttons_set_open = [button_settings, button_quit, button_settings_open]
+    hud = HUD(profiler, (255, 255, 255), (0, 0, 0), 0.01*var[0] + 210, 0.01*var[0], 280, # only shown if profiler is enabled
+              extra_lines = frame_cache.summary_lines)
+    buttons_set_zoom = [button_settings, button_quit, button_zoom_instructions, hud]
+    buttons_set_julia = [button_settings, button_quit, button_julia_instructions, hud]
+    buttons_set_open = [button_settings, button_quit, button_settings_open, hud]
     buttons_all = [button_settings, button_quit, button_zoom_instructions, button_julia_instructions, button_settings_open]
     return buttons_all, buttons_set_zoom, buttons_set_julia, buttons_set_open
 
-def show_buttons(screen, buttons):
-    """Take the given buttons and display them
+def wait_events():
+    """Block until at least one event arrives, then return all pending events (no busy-polling while the user is idle)"""
+    return [pygame.event.wait()] + pygame.event.get()
+
+def show_buttons(gui, screen, buttons):
+    """Take the given buttons and draw them (they are sent to the display with the next gui.update_display)
 
     Args
     ----
+    gui: Class Instance of GUI
     screen: pygame screen
         the screen on which the game is currently displayed
     buttons: list of buttons
         the buttons we want to display on the screen
     """
     for i in buttons:
-        i.show(screen)
-    pygame.display.update()
+        rect = i.show(screen)
+        if rect is not None:
+            gui.mark_dirty(rect)
 
 def update_resolution(gui, screen, var):
     """Create new pygame display if user changed resolution
@@ -104,7 +117,11 @@ def update_resolution(gui, screen, var):
         update = True
     return gui, screen, update
 
-def display_fractal(fractal, gui, screen, var, pg_x = 0, pg_y = 0, c_x = 0, c_y = 0):
+def get_color_settings(var):
+    """Return color settings (cmap, unique colors, interpolation, color norm) of currently selected options"""
+    return (var[2][1], var[3][1], var[2][2], var[2][3])
+
+def display_fractal(fractal, gui, screen, var, pg_x = 0, pg_y = 0, c_x = 0, c_y = 0, cache = None):
     """Update fractal with current settings, recalculate and show it in pygame
     
     Args
@@ -118,6 +135,8 @@ def display_fractal(fractal, gui, screen, var, pg_x = 0, pg_y = 0, c_x = 0, c_y
         pygame coordinates that denote from where on we will show the given fractal on the given screen (default = 0 as we usually start in top left corner)
     c_x, c_y: integer
         complex coordinates of a point selected by the user (used to update JuliaSet; default = 0)
+    cache: class instance of FrameCache
+        if given, the frame is taken from / added to the cache instead of always being calculated (see pygameGUI.prefetch)
     """
     # update fractal variables
     if var[2][4] == 1:
@@ -129,12 +148,22 @@ def display_fractal(fractal, gui, screen, var, pg_x = 0, pg_y = 0, c_x = 0, c_y
     if isinstance(fractal, JuliaSet): # update with chosen C value if fractal is a JuliaSet
         fractal.max_iter = 200 # no need for very high max_iter values as zoom is disabled (override user setting)
         fractal.C = c_x + c_y *1j
-    # calculate fractal
-    m, ms = fractal.calc()
-    mu_rgb = fractal.color_fractal(m, ms, var[2][1], var[3][1], var[2][2], var[2][3])
-    # blit to screen
-    surface = gui.make_surface(mu_rgb)
-    screen.blit(surface, (pg_x, pg_y))
+    with profiler.frame(type(fractal).__name__, fractal.width * fractal.height):
+        mu_rgb = None
+        if cache is not None:
+            with profiler.stage('cache lookup'):
+                key = frame_key(fractal, get_color_settings(var))
+                mu_rgb = cache.get(key)
+        if mu_rgb is None:
+            # calculate fractal
+            mu_rgb = fractal.render(*get_color_settings(var))
+            if cache is not None:
+                cache.put(key, mu_rgb.copy()) # copy, as the pooled buffer is reused by the next frame
+        # blit to screen
+        with profiler.stage('make surface'):
+            surface = gui.make_surface(mu_rgb)
+        with profiler.stage('blit'):
+            gui.mark_dirty(screen.blit(surface, (pg_x, pg_y)))
 
 def zoom_fractal(lmr_click, fractal, point):
     """Zoom / move fractal on screen depending on type of mouseclick (left / middle / right)
@@ -155,11 +184,23 @@ def zoom_fractal(lmr_click, fractal, point):
     elif lmr_click == 3:
         fractal.zoom((c_x, c_y), 0.33)
 
-def main():
+def main(get_events = wait_events, open_settings = show_ui, on_frame = None):
+    """Run the program
+
+    Args
+    ----
+    get_events: function
+        returns list of pygame events (replaced to record / replay sessions, see pygameGUI.session)
+    open_settings: function
+        opens settings window and returns UserInput instance (same arguments as show_ui)
+    on_frame: function
+        if given, called with the handled events after every (possibly empty) display update (e.g. to measure latency)
+    """
     run = True
+    warmup.start(calibrate = True) # load numba kernels and select fastest backend while settings window is open
     label_names, options = fetch_options()
     var = (1280, 960, [0, 0, 2, 1, 0], [100, 4000]) # default settings when program is started
-    ui = show_ui(label_names, options, var) # open settings
+    ui = open_settings(label_names, options, var) # open settings
     var = ui.get_inputs() # read chosen settings
 
     # initialise pygame
@@ -174,38 +215,55 @@ def main():
     mandel = Mandelbrot(var[0], var[1], var[3][0])
     display_fractal(mandel, gui, screen, var)
     julia = JuliaSet(int(var[0]/2), var[1], var[3][0])
+    # render julia sets along the predicted hover path on the idle cores (number of workers can be set with FRACTALS_PREFETCH_WORKERS)
+    prefetch_workers = os.environ.get('FRACTALS_PREFETCH_WORKERS')
+    prefetcher = JuliaPrefetcher(frame_cache, int(prefetch_workers) if prefetch_workers else None)
 
-    show_buttons(screen, buttons_set_zoom)
+    show_buttons(gui, screen, buttons_set_zoom)
     
     while run:
-        for event in pygame.event.get():
+        events = get_events()
+        for event in events:
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and buttons_all[0].isOver(event.pos): # open settings
-                show_buttons(screen, buttons_set_open)
-                ui = show_ui(label_names, options, var) # open settings
+                show_buttons(gui, screen, buttons_set_open)
+                gui.update_display() # show message before the settings window blocks the loop
+                ui = open_settings(label_names, options, var) # open settings
                 var = ui.get_inputs() # read selected settings
                 gui, screen, update = update_resolution(gui, screen, var)
                 if update == True: # if new resolution selected
                     buttons_all, buttons_set_zoom, buttons_set_julia, buttons_set_open = create_buttons(var)
                 display_fractal(mandel, gui, screen, var)
                 if var[2][4] == 0:
-                    show_buttons(screen, buttons_set_zoom)
+                    show_buttons(gui, screen, buttons_set_zoom)
                 elif var[2][4] == 1:
                     display_fractal(julia, gui, screen, var, var[0]/2, 0, julia.C.real, julia.C.imag)
-                    show_buttons(screen, buttons_set_julia)
+                    show_buttons(gui, screen, buttons_set_julia)
 
             elif (event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and buttons_all[1].isOver(event.pos)) or event.type == pygame.QUIT: # exit game
                 run = False
 
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_p: # toggle profiler & HUD (redraw to show / remove HUD)
+                profiler.toggle()
+                display_fractal(mandel, gui, screen, var)
+                if var[2][4] == 0:
+                    show_buttons(gui, screen, buttons_set_zoom)
+                elif var[2][4] == 1:
+                    display_fractal(julia, gui, screen, var, var[0]/2, 0, julia.C.real, julia.C.imag)
+                    show_buttons(gui, screen, buttons_set_julia)
+
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_t: # export recorded frames as chrome trace
+                profiler.export_trace(os.environ.get('FRACTALS_TRACE', 'fractal_trace.json'))
+
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button <= 3: # zoom
                 point = event.pos
                 if var[2][4] == 1 and point[0] < int(var[0]/2): # if Julia enabled, limit points that mandelbrot can be zoomed at
                     zoom_fractal(event.button, mandel, point)
                     display_fractal(mandel, gui, screen, var)
-                    show_buttons(screen, buttons_set_julia)      
+                    show_buttons(gui, screen, buttons_set_julia)      
                 elif var[2][4] == 0:
                     zoom_fractal(event.button, mandel, point)
                     display_fractal(mandel, gui, screen, var)
-                    show_buttons(screen, buttons_set_zoom)               
+                    show_buttons(gui, screen, buttons_set_zoom)               
 
             elif var[2][4] == 1 and event.type == pygame.MOUSEMOTION: # update julia set
                 point = event.pos
@@ -214,13 +272,25 @@ def main():
                 if current_tick > next_tick and point[0] < int(var[0]/2): # if mouse hovers above mandelbrot, update julia set every 15 ms (roughly 60fps)
                     next_tick += 15
                     c_x, c_y = mandel.get_coord(point)
-                    display_fractal(julia, gui, screen, var, var[0]/2, 0, c_x, c_y)
-                    show_buttons(screen, buttons_set_julia)
+                    display_fractal(julia, gui, screen, var, var[0]/2, 0, c_x, c_y, frame_cache)
+                    show_buttons(gui, screen, buttons_set_julia)
+                    prefetcher.update(mandel, julia, get_color_settings(var), point, (int(var[0]/2), var[1]))
 
-        pygame.display.update()
+        gui.update_display() # only send changed areas (fractal panes and buttons) to the display
+        if on_frame is not None:
+            on_frame(events)
     
+    if profiler.frames and os.environ.get('FRACTALS_TRACE'): # export recorded frames on exit
+        profiler.export_trace(os.environ['FRACTALS_TRACE'])
+    prefetcher.shutdown()
+    if frame_cache.summary_lines():
+        print('\n'.join(frame_cache.summary_lines()))
     pygame.quit()
     quit()
 
 if __name__=='__main__':
-    main()
\ No newline at end of file
+    if os.environ.get('FRACTALS_RECORD'): # record session (replay it with benchmarks/replay.py)
+        recorder = SessionRecorder(os.environ['FRACTALS_RECORD'])
+        main(recorder.record_events(wait_events), recorder.record_settings(show_ui))
+    else:
+        main()
\ No newline at end of file
@@ -2,6 +2,14 @@
 import pygame
 import numpy as np
 
+fonts = {} # font size -> pygame font (SysFont searches the installed fonts, so every size is only created once)
+
+def get_font(size):
+    """Return comicsans font of given size"""
+    if size not in fonts:
+        fonts[size] = pygame.font.SysFont('comicsans', size)
+    return fonts[size]
+
 class GUI(object):
     """Stores basic variables of pygame GUI (widht, height and caption of window)"""
     def __init__(self, name, width, height):
@@ -16,8 +24,19 @@ class GUI(object):
         """
         self.width = width
         self.height = height
+        self.dirty = [] # screen areas that changed since the last display update
         pygame.display.set_caption(name)
 
+    def mark_dirty(self, rect):
+        """Remember that rect (pygame.Rect) of the screen changed and has to be sent to the display"""
+        self.dirty.append(rect)
+
+    def update_display(self):
+        """Send changed areas of the screen to the display (nothing happens if nothing changed)"""
+        if self.dirty:
+            pygame.display.update(self.dirty)
+            self.dirty = []
+
     def make_surface(self, mu_rgb):
         """Create pygame surface. Swap rows and columns of mu_rgb to move from matrix coordinate space to pygame coordinate space
         
@@ -48,6 +67,23 @@ class Button():
         self.width = width
         self.height = height
         self.text = text
+        self.surface = None # rendered button (only rendered again if text or size change)
+        self.surface_key = None
+
+    def render(self):
+        """Render button including its outline onto a surface of its own"""
+        surface = pygame.Surface((self.width+4, self.height+4))
+        pygame.draw.rect(surface, True, (0, 0, self.width+4, self.height+4), 0) # draw black rectangle
+        # draw button on same spot that is slightly smaller (left-over black rectangle creates outline)
+        pygame.draw.rect(surface, self.color, (2, 2, self.width, self.height), 0)
+
+        if self.text != '':
+            rendered_txt = get_font(22).render(self.text, 1, self.text_color)
+            # same (truncated) screen position as when the text is drawn onto the screen directly
+            txt_x = int(self.x_pos + (self.width / 2 - rendered_txt.get_width() / 2)) - int(self.x_pos - 2)
+            txt_y = int(self.y_pos + (self.height/2 - rendered_txt.get_height()/2)) - int(self.y_pos - 2)
+            surface.blit(rendered_txt, (txt_x, txt_y))
+        return surface
 
     def show(self, screen):
         """Show buttons on pygame screen
@@ -56,15 +92,15 @@ class Button():
         ----
         screen: pygame screen
             the screen on which the game is currently displayed
+
+        Returns
+        -------
+        pygame.Rect of the screen area that was drawn
         """
-        pygame.draw.rect(screen, True, (self.x_pos-2, self.y_pos-2, self.width+4, self.height+4), 0) # draw black rectangle
-        # draw button on same spot that is slightly smaller (left-over black rectangle creates outline)
-        pygame.draw.rect(screen, self.color, (self.x_pos, self.y_pos, self.width,self.height), 0) 
-        
-        if self.text != '':
-            font = pygame.font.SysFont('comicsans', 22)
-            rendered_txt = font.render(self.text, 1, self.text_color)
-            screen.blit(rendered_txt, (self.x_pos + (self.width / 2 - rendered_txt.get_width() / 2), self.y_pos + (self.height/2 - rendered_txt.get_height()/2)))
+        key = (self.text, self.width, self.height, self.color, self.text_color)
+        if self.surface_key != key:
+            self.surface, self.surface_key = self.render(), key
+        return screen.blit(self.surface, (self.x_pos-2, self.y_pos-2))
 
     def isOver(self, point):
         """Detect if given point (as tuple (x,y)) is within the x- and y-limits of the button
@@ -76,4 +112,52 @@ class Button():
         if point[0] > self.x_pos and point[0] < self.x_pos + self.width:
             if point[1] > self.y_pos and point[1] < self.y_pos + self.height:
                 return True
-        return False
\ No newline at end of file
+        return False
+
+class HUD():
+    """On-screen overlay that shows the timings of the last frame recorded by a profiler (see fractals.profiler)"""
+    def __init__(self, profiler, color, text_color, x_pos, y_pos, width, line_height = 22, extra_lines = None):
+        self.profiler = profiler
+        self.extra_lines = extra_lines # function that returns further lines to show below the timings (e.g. cache hit rate)
+        self.color = color
+        self.text_color = text_color
+        self.x_pos = x_pos
+        self.y_pos = y_pos
+        self.width = width
+        self.line_height = line_height
+        self.surface = None # rendered lines of the last frame (only rendered again if the profiler recorded a new frame)
+        self.lines = None
+        self.max_lines = 0 # the HUD keeps the height of the most lines shown, so a shorter frame covers all earlier text
+
+    def show(self, screen):
+        """Show timings of last frame on pygame screen (only if profiler is enabled)
+
+        Args
+        ----
+        screen: pygame screen
+            the screen on which the game is currently displayed
+
+        Returns
+        -------
+        pygame.Rect of the screen area that was drawn (None if profiler is disabled)
+        """
+        if not self.profiler.enabled:
+            return None
+        lines = self.profiler.summary_lines()
+        if self.extra_lines is not None:
+            lines = lines + self.extra_lines()
+        if lines != self.lines:
+            self.max_lines = max(self.max_lines, len(lines))
+            height = self.max_lines * self.line_height + 10
+            self.surface = pygame.Surface((self.width+4, height+4))
+            pygame.draw.rect(self.surface, True, (0, 0, self.width+4, height+4), 0) # draw black rectangle
+            pygame.draw.rect(self.surface, self.color, (2, 2, self.width, height), 0)
+            for i, line in enumerate(lines):
+                rendered_txt = get_font(18).render(line, 1, self.text_color)
+                self.surface.blit(rendered_txt, (2 + 8, 2 + 5 + i * self.line_height))
+            self.lines = lines
+        return screen.blit(self.surface, (self.x_pos-2, self.y_pos-2))
+
+    def isOver(self, point):
+        """HUD does not react to clicks"""
+        return False
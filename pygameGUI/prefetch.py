@@ -0,0 +1,201 @@
+"""Speculative rendering of Julia frames along the predicted hover path
+
+While the user hovers over the Mandelbrot set, every mouse motion selects a new C (quantized to the pixel grid of the
+Mandelbrot set, see Fractal.get_coord) and the Julia set has to be rendered before the next motion can be shown.
+The pointer path is extrapolated a few motion events ahead and the Julia frames for those C values are rendered by
+low-priority worker processes on the idle cores. Finished frames are kept in a bounded cache, so hovering over a
+predicted (or previously visited) point shows the frame without rendering it.
+"""
+# import statements
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# import own .py files
+from fractals.fractals import JuliaSet
+
+def frame_key(fractal, color_settings, C = None):
+    """Key of a rendered frame: C, resolution, max_iter, viewport and palette (color_settings)
+
+    Args
+    ----
+    fractal: class instance of JuliaSet
+    color_settings: tuple (cmap, unique colors, interpolation, color norm)
+    C: complex
+        C value of the frame (default: C of fractal)
+    """
+    C = complex(fractal.C if C is None else C)
+    return (C.real, C.imag, fractal.width, fractal.height, fractal.max_iter, fractal.esc_radius_sq,
+            tuple(fractal.xlim), tuple(fractal.ylim), tuple(color_settings))
+
+def render_frame(key):
+    """Calculate and color the Julia frame described by key (runs in the worker processes)
+
+    Returns
+    -------
+    copy of mu_rgb (the pooled buffer is reused by the next frame while the result is sent back)
+    """
+    c_real, c_imag, width, height, max_iter, esc_radius_sq, xlim, ylim, color_settings = key
+    fractal = JuliaSet(width, height, max_iter, complex(c_real, c_imag), esc_radius_sq, np.array(xlim), np.array(ylim))
+    return fractal.render(*color_settings).copy()
+
+def init_worker():
+    """Use the fastest single-threaded backend, run at low priority (prefetching must not slow down the UI) and load kernels"""
+    from fractals import backends
+    backends.select_backend(backends.get_serial_backend().name)
+    if hasattr(os, 'nice'):
+        os.nice(10)
+    JuliaSet(16, 16, 10).calc() # load kernels before the first prediction arrives
+
+class FrameCache(object):
+    """Thread-safe LRU cache of rendered frames (RGB arrays) that is bounded by the total size of the frames"""
+    def __init__(self, max_bytes = 256 * 1024**2):
+        self.max_bytes = max_bytes
+        self.frames = OrderedDict() # frame key -> (mu_rgb, whether it was prefetched)
+        self.nbytes = 0
+        self.lock = threading.Lock()
+        self.stats = {'hit': 0, 'miss': 0, 'prefetch hit': 0, 'prefetched': 0}
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.frames
+
+    def get(self, key):
+        """Return cached frame (None if it is not cached) and count the lookup as hit or miss"""
+        with self.lock:
+            if key not in self.frames:
+                self.stats['miss'] += 1
+                return None
+            self.frames.move_to_end(key)
+            mu_rgb, prefetched = self.frames[key]
+            self.stats['hit'] += 1
+            self.stats['prefetch hit'] += prefetched
+            self.frames[key] = (mu_rgb, False) # only count the first hit of a prefetched frame as prefetch hit
+            return mu_rgb
+
+    def put(self, key, mu_rgb, prefetched = False):
+        """Add frame (not copied) and evict the least recently used frames until the cache fits into max_bytes"""
+        with self.lock:
+            if key in self.frames:
+                return
+            self.frames[key] = (mu_rgb, prefetched)
+            self.nbytes += mu_rgb.nbytes
+            self.stats['prefetched'] += prefetched
+            while self.nbytes > self.max_bytes and len(self.frames) > 1:
+                self.nbytes -= self.frames.popitem(last = False)[1][0].nbytes
+
+    def hit_rate(self):
+        lookups = self.stats['hit'] + self.stats['miss']
+        return self.stats['hit'] / lookups if lookups else 0.0
+
+    def summary_lines(self):
+        """Hit rate and contents of the cache as lines of text (shown in the HUD, see pygameGUI.GUI)"""
+        if self.stats['hit'] + self.stats['miss'] == 0:
+            return []
+        return ['julia cache: {:.0%} hits ({} prefetched)'.format(self.hit_rate(), self.stats['prefetch hit']),
+                '  {} frames, {:.0f} MB'.format(len(self.frames), self.nbytes / 1024**2)]
+
+class TrajectoryPredictor(object):
+    """Predicts the next pointer positions by linear extrapolation of the recent motion events"""
+    def __init__(self, history = 4, steps = 3):
+        """Constructor of TrajectoryPredictor class instance
+
+        Args
+        ----
+        history: integer
+            number of recent positions the velocity is averaged over
+        steps: integer
+            number of motion events to predict
+        """
+        self.points = deque(maxlen = history)
+        self.steps = steps
+
+    def add(self, point):
+        self.points.append(point)
+
+    def predict(self):
+        """Return the next positions (pygame coordinates), assuming the pointer keeps its mean velocity per event"""
+        if len(self.points) < 2:
+            return []
+        (x_0, y_0), (x_1, y_1) = self.points[0], self.points[-1]
+        n = len(self.points) - 1
+        dx, dy = (x_1 - x_0) / n, (y_1 - y_0) / n
+        if dx == 0 and dy == 0:
+            return []
+        return [(int(round(x_1 + k*dx)), int(round(y_1 + k*dy))) for k in range(1, self.steps + 1)]
+
+class JuliaPrefetcher(object):
+    """Renders the Julia frames of the predicted hover path in worker processes and puts them into a FrameCache"""
+    def __init__(self, cache, workers = None, predictor = None):
+        """Constructor of JuliaPrefetcher class instance
+
+        Args
+        ----
+        cache: class instance of FrameCache
+        workers: integer
+            number of worker processes (default: all cores but the one of the UI; prefetching is disabled if 0)
+        predictor: class instance of TrajectoryPredictor
+        """
+        self.cache = cache
+        self.workers = (os.cpu_count() or 1) - 1 if workers is None else workers
+        self.predictor = TrajectoryPredictor() if predictor is None else predictor
+        self.executor = None # started with the first prediction
+        self.inflight = {} # frame key -> future of frame that is currently rendered (or waiting for a worker)
+        self.lock = threading.RLock() # reentrant as finish runs right away when a future is cancelled
+
+    def update(self, mandel, julia, color_settings, point, pane):
+        """Record hover position and prefetch the Julia frames of the predicted positions
+
+        Args
+        ----
+        mandel: class instance of Mandelbrot
+            the C values of the predicted positions are read from its pixel grid
+        julia: class instance of JuliaSet
+            frame that was just shown (the prefetched frames only differ in C)
+        color_settings: tuple (cmap, unique colors, interpolation, color norm)
+        point: tuple of 2 integer (pygame coordinates)
+        pane: tuple of 2 integer
+            width, height of the screen area of the Mandelbrot set (predictions outside of it are dropped)
+        """
+        self.predictor.add(point)
+        if self.workers == 0:
+            return
+        keys = []
+        for x, y in self.predictor.predict():
+            if 0 <= x < pane[0] and 0 <= y < pane[1]:
+                c_x, c_y = mandel.get_coord((x, y))
+                keys.append(frame_key(julia, color_settings, c_x + c_y *1j))
+        with self.lock:
+            # drop predictions of an outdated path that did not start yet
+            for key, future in list(self.inflight.items()):
+                if key not in keys and future.cancel():
+                    self.inflight.pop(key, None)
+            for key in keys:
+                if key in self.inflight or key in self.cache or len(self.inflight) >= 2 * self.workers:
+                    continue
+                if self.executor is None:
+                    self.executor = ProcessPoolExecutor(max_workers = self.workers, initializer = init_worker,
+                                                        mp_context = multiprocessing.get_context('spawn'))
+                future = self.executor.submit(render_frame, key)
+                self.inflight[key] = future
+                future.add_done_callback(lambda future, key = key: self.finish(key, future))
+
+    def finish(self, key, future):
+        """Put finished frame into the cache (runs in a thread of the executor)"""
+        with self.lock:
+            self.inflight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result(), prefetched = True)
+
+    def shutdown(self):
+        if self.executor is not None:
+            with self.lock:
+                for future in list(self.inflight.values()): # frames that did not start yet are not needed anymore
+                    future.cancel()
+            self.executor.shutdown(wait = True)
+            self.executor = None
+
+frame_cache = FrameCache() # cache of the Julia frames shown while hovering (hit rate is shown in the HUD)
@@ -0,0 +1,85 @@
+# import statements
+import json
+import time
+import pygame
+
+# event types that main.main reacts to (all other events are not recorded)
+RECORDED_TYPES = (pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION, pygame.KEYDOWN, pygame.QUIT)
+
+def event_to_dict(event, t):
+    """Convert pygame event to JSON serializable dict
+
+    Args
+    ----
+    event: pygame event
+    t: float
+        seconds since the start of the session
+    """
+    attributes = {}
+    for key, value in event.dict.items():
+        if isinstance(value, tuple):
+            value = list(value)
+        if isinstance(value, (int, float, str, bool, list)) or value is None:
+            attributes[key] = value
+    return {'t': t, 'kind': 'event', 'type': event.type, 'name': pygame.event.event_name(event.type), 'dict': attributes}
+
+def dict_to_event(entry):
+    """Convert recorded dict back to pygame event"""
+    attributes = {key: tuple(value) if isinstance(value, list) else value for key, value in entry['dict'].items()}
+    return pygame.event.Event(entry['type'], attributes)
+
+class RecordedSettings(object):
+    """Stands in for UserInput when a session is replayed (returns the settings that were chosen during the recording)"""
+    def __init__(self, var):
+        self.var = var
+
+    def get_inputs(self):
+        width, height, dropdown_values, slider_values = self.var
+        return (width, height, list(dropdown_values), list(slider_values))
+
+class SessionRecorder(object):
+    """Writes pygame events and chosen settings of an interactive session to a JSON lines file (see benchmarks/replay.py)"""
+    def __init__(self, path):
+        """Constructor of SessionRecorder class instance
+
+        Args
+        ----
+        path: str
+            path of JSON lines file the session is written to
+        """
+        self.file = open(path, 'w')
+        self.t_start = time.perf_counter()
+
+    def write(self, entry):
+        """Append entry to file (flushed immediately so that nothing is lost when the program quits)"""
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+
+    def record_events(self, get_events):
+        """Wrap event source (e.g. pygame.event.get) so that all returned events are recorded"""
+        def recorded_get_events():
+            events = get_events()
+            t = time.perf_counter() - self.t_start
+            for event in events:
+                if event.type in RECORDED_TYPES:
+                    self.write(event_to_dict(event, t))
+            return events
+        return recorded_get_events
+
+    def record_settings(self, show_ui):
+        """Wrap settings window (main.show_ui) so that the chosen settings are recorded"""
+        def recorded_show_ui(label_names, options, var):
+            ui = show_ui(label_names, options, var)
+            self.write({'t': time.perf_counter() - self.t_start, 'kind': 'settings', 'var': list(ui.get_inputs())})
+            return ui
+        return recorded_show_ui
+
+def load_session(path):
+    """Read recorded session
+
+    Returns
+    -------
+    list of dicts (events and settings) in the order they were recorded
+    """
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
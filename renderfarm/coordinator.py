@@ -0,0 +1,298 @@
+"""Coordinator of the tile render farm: splits a render job into tiles and hands them to workers over TCP
+
+Start the coordinator, then one worker per core on every machine (python -m renderfarm.worker --host <coordinator>).
+For a test on one box, --local-workers N starts N workers on localhost:
+    python -m renderfarm.coordinator --width 8000 --height 6000 --max-iter 1000 --local-workers 4 --output poster.png
+The protocol has no authentication, so only listen on other interfaces than localhost (--host 0.0.0.0) in a trusted network.
+"""
+# import own .py files
+from fractals.buffers import iter_dtype
+from fractals.fractals import Mandelbrot, JuliaSet
+from renderfarm.protocol import recv_message, send_message
+from tileserver.tiles import encode_png
+
+# import statements
+import argparse
+import collections
+import os
+import select
+import socket
+import subprocess
+import sys
+import threading
+import time
+import zlib
+import numpy as np
+
+class RenderJob(object):
+    """Splits a fractal into tiles and assembles the rendered tiles"""
+    def __init__(self, fractal, tile_size = 256, output = 'iter', color_settings = (0, 4000, 2, 1)):
+        """Constructor of RenderJob class instance
+
+        Args
+        ----
+        fractal: class instance of Mandelbrot or JuliaSet
+            describes the whole image (resolution, viewport, max_iter)
+        tile_size: int
+            number of pixels per tile side
+        output: str
+            'iter' (workers return m, ms and the coordinator colors the whole image) or 'rgb' (workers color their tiles)
+        color_settings: tuple
+            cmap_id, unique_colors, interpolation_method, color_norm (see Fractal.color_fractal; color_norm 2 needs output 'rgb')
+        """
+        if output == 'iter' and color_settings[3] == 2:
+            raise ValueError("color_norm 2 (distance estimate) needs output 'rgb', as workers only return m, ms for output 'iter'")
+        self.fractal = fractal
+        self.tile_size = tile_size
+        self.output = output
+        self.color_settings = tuple(color_settings)
+        shape = (fractal.height, fractal.width)
+        if output == 'rgb':
+            self.rgb = np.zeros(shape + (3,), dtype = np.uint8)
+        else:
+            self.m, self.ms = np.zeros(shape, dtype = iter_dtype(fractal.max_iter)), np.zeros(shape, dtype = np.float32)
+
+    def make_tasks(self):
+        """Return list of tasks (one per tile), each one a complete description of the tile's Fractal viewport
+
+        Every tile is a window of the grid of the whole image (see Fractal), so the assembled image equals the image
+        rendered in one piece.
+        """
+        fractal = self.fractal
+        is_julia = isinstance(fractal, JuliaSet)
+        tasks = []
+        for row in range(0, fractal.height, self.tile_size):
+            for col in range(0, fractal.width, self.tile_size):
+                tasks.append({'type': 'task', 'task_id': len(tasks), 'fractal': 'julia' if is_julia else 'mandelbrot',
+                              'C': [fractal.C.real, fractal.C.imag] if is_julia else None,
+                              'row': row, 'col': col, 'width': min(self.tile_size, fractal.width - col),
+                              'height': min(self.tile_size, fractal.height - row), 'window': [row, col, fractal.height, fractal.width],
+                              'xlim': [float(v) for v in fractal.xlim], 'ylim': [float(v) for v in fractal.ylim],
+                              'max_iter': fractal.max_iter, 'esc_radius_sq': fractal.esc_radius_sq,
+                              'output': self.output, 'color_settings': self.color_settings})
+        return tasks
+
+    def add_result(self, task, header, payload):
+        """Decompress rendered tile and copy it into the image"""
+        rows, cols = slice(task['row'], task['row'] + task['height']), slice(task['col'], task['col'] + task['width'])
+        data = zlib.decompress(payload)
+        if self.output == 'rgb':
+            self.rgb[rows, cols] = np.frombuffer(data, dtype = np.uint8).reshape(task['height'], task['width'], 3)
+        else:
+            n_pixels = task['width'] * task['height']
+            m = np.frombuffer(data, dtype = header['dtype'], count = n_pixels)
+            ms = np.frombuffer(data, dtype = np.float32, offset = m.nbytes)
+            self.m[rows, cols] = m.reshape(task['height'], task['width'])
+            self.ms[rows, cols] = ms.reshape(task['height'], task['width'])
+
+    def get_image(self):
+        """Return RGB values of the whole image (uint8 array with shape (height, width, 3))"""
+        if self.output == 'rgb':
+            return self.rgb
+        return self.fractal.color_fractal(self.m, self.ms, *self.color_settings)
+
+class Coordinator(object):
+    """Accepts worker connections and distributes the tasks of a job among them
+
+    Every worker gets up to `prefetch` tasks at once, so it can start the next tile while the last result is in transit.
+    A worker that closes its connection or stays silent for heartbeat_timeout seconds is dropped and its tiles are
+    handed to the remaining workers.
+    """
+    def __init__(self, host = '127.0.0.1', port = 9000, heartbeat_timeout = 5.0, prefetch = 2):
+        self.heartbeat_timeout = heartbeat_timeout
+        self.prefetch = prefetch
+        self.listener = socket.create_server((host, port))
+        self.address = self.listener.getsockname()
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.job = None
+        self.workers = collections.OrderedDict() # worker name -> throughput statistics
+        threading.Thread(target = self.accept_workers, daemon = True).start()
+
+    def accept_workers(self):
+        while not self.closed.is_set():
+            try:
+                conn, addr = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target = self.serve_worker, args = (conn, addr), daemon = True).start()
+
+    def next_task(self):
+        """Return next task of the current job that has not been rendered yet (None if there is none)"""
+        with self.lock:
+            if self.job is None:
+                return None
+            while self.queue:
+                task = self.queue.popleft()
+                if task['task_id'] in self.remaining:
+                    return task
+        return None
+
+    def serve_worker(self, conn, addr):
+        """Send tasks to one worker and collect its results until the coordinator is closed or the worker is lost"""
+        outstanding = collections.OrderedDict() # task_id -> task sent to this worker but not returned yet
+        stats = None
+        conn.settimeout(self.heartbeat_timeout) # a worker that stops in the middle of a message counts as lost
+        try:
+            header, payload = recv_message(conn)
+            if header.get('type') != 'hello':
+                return
+            with self.lock:
+                name = header['name']
+                if name in self.workers and self.workers[name]['connected']:
+                    name = '{}@{}:{}'.format(name, *addr[:2])
+                stats = self.workers.setdefault(name, {'backend': header.get('backend'), 'tiles': 0, 'pixels': 0,
+                                                       'busy_s': 0.0, 'bytes': 0, 'lost': 0})
+                stats['connected'] = True
+            last_seen = time.perf_counter()
+            while not self.closed.is_set():
+                while len(outstanding) < self.prefetch:
+                    task = self.next_task()
+                    if task is None:
+                        break
+                    outstanding[task['task_id']] = task
+                    send_message(conn, task)
+                if time.perf_counter() - last_seen > self.heartbeat_timeout:
+                    raise ConnectionError('no heartbeat from {} for {:.1f}s'.format(name, self.heartbeat_timeout))
+                if not select.select([conn], [], [], 0.2)[0]:
+                    continue
+                header, payload = recv_message(conn)
+                last_seen = time.perf_counter()
+                if header['type'] == 'result':
+                    self.finish_task(outstanding.pop(header['task_id']), header, payload, stats)
+        except (OSError, ValueError, KeyError) as e: # ConnectionError is a subclass of OSError
+            if stats is not None:
+                stats['lost'] += 1
+                print('lost worker {}: {} ({} tiles reassigned)'.format(name, e, len(outstanding)), file = sys.stderr)
+        finally:
+            with self.lock:
+                if self.job is not None:
+                    self.queue.extendleft(reversed(outstanding.values()))
+                if stats is not None:
+                    stats['connected'] = False
+            try:
+                send_message(conn, {'type': 'shutdown'})
+            except OSError:
+                pass
+            conn.close()
+
+    def finish_task(self, task, header, payload, stats):
+        with self.lock:
+            if self.job is None or task['task_id'] not in self.remaining: # late result of a reassigned tile
+                return
+            self.remaining.discard(task['task_id'])
+            stats['tiles'] += 1
+            stats['pixels'] += task['width'] * task['height']
+            stats['busy_s'] += header['elapsed']
+            stats['bytes'] += len(payload)
+            job = self.job
+        job.add_result(task, header, payload)
+        with self.lock:
+            self.results_added += 1
+            if self.results_added == self.n_tasks:
+                self.done.set()
+
+    def run(self, job, timeout = None):
+        """Render all tiles of job with the connected workers (and the ones that connect later)
+
+        Returns
+        -------
+        duration of the job in seconds
+
+        Raises
+        ------
+        TimeoutError if the job did not finish within timeout seconds
+        """
+        tasks = job.make_tasks()
+        with self.lock:
+            self.queue = collections.deque(tasks)
+            self.remaining = set(task['task_id'] for task in tasks)
+            self.n_tasks, self.results_added = len(tasks), 0
+            self.done = threading.Event()
+            self.job = job
+        t_start = time.perf_counter()
+        finished = self.done.wait(timeout)
+        with self.lock:
+            self.job = None
+        if not finished:
+            raise TimeoutError('{} of {} tiles missing after {}s'.format(len(self.remaining), len(tasks), timeout))
+        return time.perf_counter() - t_start
+
+    def report(self, duration):
+        """Return lines of the throughput report of the last job"""
+        total_pixels = sum(stats['pixels'] for stats in self.workers.values())
+        lines = ['{:.2f} Mpixel in {:.2f}s ({:.2f} Mpixel/s) with {} workers'.format(
+            total_pixels / 1e6, duration, total_pixels / 1e6 / duration, len(self.workers))]
+        for name, stats in self.workers.items():
+            rate = stats['pixels'] / stats['busy_s'] / 1e6 if stats['busy_s'] > 0 else 0.0
+            lines.append('  {:<24} {:>5} tiles  {:6.2f} Mpixel/s busy  {:5.1f}% of pixels  {:7.1f} kB sent  {}{}'.format(
+                name, stats['tiles'], rate, 100 * stats['pixels'] / max(total_pixels, 1), stats['bytes'] / 1024,
+                stats['backend'], '  (lost)' if stats['lost'] else ''))
+        return lines
+
+    def close(self):
+        self.closed.set()
+        self.listener.close()
+
+def start_local_workers(port, n_workers, backend = None, fail_after = None):
+    """Start n_workers worker processes on this machine that connect to the coordinator on localhost
+
+    Returns
+    -------
+    list of subprocess.Popen
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    processes = []
+    for i in range(n_workers):
+        command = [sys.executable, '-m', 'renderfarm.worker', '--port', str(port), '--name', 'local-{}'.format(i)]
+        if backend is not None:
+            command += ['--backend', backend]
+        if fail_after is not None and i == 0: # only the first worker fails, the others take over its tiles
+            command += ['--fail-after', str(fail_after)]
+        processes.append(subprocess.Popen(command, cwd = root))
+    return processes
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Coordinator of the tile render farm')
+    parser.add_argument('--host', default = '127.0.0.1', help = 'interface to listen on (0.0.0.0 for workers on other machines)')
+    parser.add_argument('--port', type = int, default = 9000)
+    parser.add_argument('--width', type = int, default = 4000)
+    parser.add_argument('--height', type = int, default = 3000)
+    parser.add_argument('--max-iter', type = int, default = 500)
+    parser.add_argument('--xlim', type = float, nargs = 2, help = 'viewport (default: whole fractal)')
+    parser.add_argument('--ylim', type = float, nargs = 2)
+    parser.add_argument('--julia', type = float, nargs = 2, metavar = ('RE', 'IM'), help = 'render Julia set of C = RE + IM*1j')
+    parser.add_argument('--tile', type = int, default = 256, help = 'number of pixels per tile side')
+    parser.add_argument('--rgb', action = 'store_true', help = 'workers color their tiles (default: workers return m, ms)')
+    parser.add_argument('--cmap', type = int, default = 0)
+    parser.add_argument('--colors', type = int, default = 4000)
+    parser.add_argument('--local-workers', type = int, default = 0, help = 'number of workers to start on this machine')
+    parser.add_argument('--backend', help = 'compute backend of the local workers')
+    parser.add_argument('--fail-after', type = int, help = 'first local worker exits after given number of tiles (tests reassignment)')
+    parser.add_argument('--timeout', type = float, help = 'abort job after given number of seconds')
+    parser.add_argument('--output', help = 'PNG file of the rendered image')
+    args = parser.parse_args()
+
+    limits = {key: np.array(value) for key, value in (('xlim', args.xlim), ('ylim', args.ylim)) if value is not None}
+    if args.julia is not None:
+        fractal = JuliaSet(args.width, args.height, args.max_iter, complex(*args.julia), **limits)
+    else:
+        fractal = Mandelbrot(args.width, args.height, args.max_iter, **limits)
+    job = RenderJob(fractal, args.tile, 'rgb' if args.rgb else 'iter', (args.cmap, args.colors, 2, 1))
+
+    coordinator = Coordinator(args.host, args.port)
+    print('coordinator listening on {}:{}'.format(*coordinator.address[:2]))
+    processes = start_local_workers(coordinator.address[1], args.local_workers, args.backend, args.fail_after)
+    try:
+        duration = coordinator.run(job, args.timeout)
+        print('\n'.join(coordinator.report(duration)))
+        if args.output is not None:
+            with open(args.output, 'wb') as f:
+                f.write(encode_png(job.get_image()))
+    finally:
+        coordinator.close()
+        for process in processes:
+            process.wait(timeout = 10)
+
+if __name__ == '__main__':
+    main()
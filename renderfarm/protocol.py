@@ -0,0 +1,44 @@
+"""Message format between coordinator and workers
+
+Every message is a JSON header plus an optional binary payload:
+    4 bytes header length | 4 bytes payload length | header (JSON, utf-8) | payload
+Messages (header 'type'):
+    hello      worker -> coordinator   {'name', 'backend'}
+    task       coordinator -> worker   tile to render (see RenderJob.make_tasks)
+    result     worker -> coordinator   {'task_id', 'elapsed', 'dtype'}, payload: zlib compressed m + ms or RGB of tile
+    heartbeat  worker -> coordinator   sent every few seconds so that the coordinator notices lost workers
+    shutdown   coordinator -> worker   job is finished
+"""
+# import statements
+import json
+import struct
+
+PREFIX = struct.Struct('>II')
+
+def send_message(sock, header, payload = b''):
+    """Send header (JSON serializable dict) and payload (bytes) over socket"""
+    data = json.dumps(header).encode()
+    sock.sendall(PREFIX.pack(len(data), len(payload)) + data + payload)
+
+def recv_exact(sock, n_bytes):
+    """Read exactly n_bytes from socket (raises ConnectionError if the connection is closed before)"""
+    chunks = []
+    while n_bytes > 0:
+        chunk = sock.recv(min(n_bytes, 1 << 20))
+        if not chunk:
+            raise ConnectionError('connection closed')
+        chunks.append(chunk)
+        n_bytes -= len(chunk)
+    return b''.join(chunks)
+
+def recv_message(sock):
+    """Receive one message
+
+    Returns
+    -------
+    header: dict
+    payload: bytes
+    """
+    header_length, payload_length = PREFIX.unpack(recv_exact(sock, PREFIX.size))
+    header = json.loads(recv_exact(sock, header_length).decode())
+    return header, recv_exact(sock, payload_length)
@@ -0,0 +1,142 @@
+"""Render worker: connects to a coordinator, renders the tiles it is sent and streams them back compressed
+
+Usage: python -m renderfarm.worker --host <coordinator host> --port 9000
+"""
+# import own .py files
+from fractals import backends
+from fractals.fractals import Mandelbrot, JuliaSet
+from renderfarm.protocol import recv_message, send_message
+
+# import statements
+import argparse
+import multiprocessing
+import multiprocessing.connection
+import os
+import socket
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+def render_task(task):
+    """Render one tile
+
+    Returns
+    -------
+    header: dict
+        result header (without task_id)
+    payload: bytes
+        zlib compressed m + ms (output 'iter') or RGB values (output 'rgb') of tile
+    """
+    t_start = time.perf_counter()
+    xlim, ylim, window = np.array(task['xlim']), np.array(task['ylim']), tuple(task['window'])
+    if task['fractal'] == 'mandelbrot':
+        fractal = Mandelbrot(task['width'], task['height'], task['max_iter'], task['esc_radius_sq'], xlim, ylim, window = window)
+    else:
+        fractal = JuliaSet(task['width'], task['height'], task['max_iter'], complex(*task['C']), task['esc_radius_sq'], xlim, ylim,
+                           window = window)
+    if task['output'] == 'rgb':
+        data, dtype = fractal.render(*task['color_settings']).tobytes(), 'uint8'
+    else:
+        m, ms = fractal.calc()
+        data, dtype = m.tobytes() + ms.tobytes(), m.dtype.name
+    payload = zlib.compress(data, 1)
+    return {'elapsed': time.perf_counter() - t_start, 'dtype': dtype}, payload
+
+def exit_with_parent():
+    """Exit the render process as soon as the worker process is gone (also if it was killed)"""
+    multiprocessing.connection.wait([multiprocessing.parent_process().sentinel])
+    os._exit(1)
+
+def init_renderer(backend):
+    """Select backend of the render process and load compiled kernels before the first tile (so they do not count towards its render time)"""
+    threading.Thread(target = exit_with_parent, daemon = True).start()
+    backends.select_backend(backend)
+    Mandelbrot(8, 8, 10).calc()
+
+def connect(host, port, retry_s = 30.0):
+    """Connect to coordinator (retries until retry_s seconds have passed, so workers can be started first)"""
+    t_start = time.perf_counter()
+    while True:
+        try:
+            return socket.create_connection((host, port))
+        except OSError:
+            if time.perf_counter() - t_start > retry_s:
+                raise
+            time.sleep(0.2)
+
+def send_heartbeats(sock, send_lock, stop, interval):
+    """Send heartbeat every interval seconds until stop is set"""
+    while not stop.wait(interval):
+        try:
+            with send_lock:
+                send_message(sock, {'type': 'heartbeat'})
+        except OSError:
+            return
+
+def run_worker(host, port, name = None, backend = None, heartbeat_interval = 1.0, fail_after = None):
+    """Render tiles for coordinator until it sends shutdown
+
+    Args
+    ----
+    host, port:
+        address of coordinator
+    name: str
+        name of worker in throughput report (default: hostname-pid)
+    backend: str
+        compute backend (default: fastest single-threaded backend, as the farm runs one worker per core)
+    heartbeat_interval: float
+        seconds between two heartbeats
+    fail_after: int
+        exit abruptly after given number of tiles (to test reassignment of lost tiles)
+    """
+    backend = backend if backend is not None else backends.get_serial_backend().name
+    name = name if name is not None else '{}-{}'.format(socket.gethostname(), os.getpid())
+    # tiles are rendered in a child process: the compiled kernels hold the GIL, which would keep the heartbeat thread
+    # from sending while a tile is rendered (and the coordinator would drop the worker on every slow tile)
+    renderer = ProcessPoolExecutor(max_workers = 1, mp_context = multiprocessing.get_context('spawn'),
+                                   initializer = init_renderer, initargs = (backend,))
+    renderer.submit(int).result() # wait until the render process has loaded the kernels
+    sock = connect(host, port)
+    send_lock, stop = threading.Lock(), threading.Event()
+    with send_lock:
+        send_message(sock, {'type': 'hello', 'name': name, 'backend': backend})
+    threading.Thread(target = send_heartbeats, args = (sock, send_lock, stop, heartbeat_interval), daemon = True).start()
+    tiles = 0
+    try:
+        while True:
+            try:
+                header, payload = recv_message(sock)
+            except OSError: # coordinator closed the connection (or dropped this worker)
+                break
+            if header['type'] == 'shutdown':
+                break
+            if header['type'] == 'task':
+                result, payload = renderer.submit(render_task, header).result()
+                result.update(type = 'result', task_id = header['task_id'])
+                try:
+                    with send_lock:
+                        send_message(sock, result, payload)
+                except OSError: # coordinator closed the connection (or dropped this worker)
+                    break
+                tiles += 1
+                if fail_after is not None and tiles >= fail_after:
+                    os._exit(1)
+    finally:
+        stop.set()
+        sock.close()
+        renderer.shutdown() # tiles are rendered one at a time, so no task is waiting
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Render worker of the tile render farm')
+    parser.add_argument('--host', default = '127.0.0.1', help = 'host of coordinator')
+    parser.add_argument('--port', type = int, default = 9000, help = 'port of coordinator')
+    parser.add_argument('--name', help = 'name of worker in throughput report')
+    parser.add_argument('--backend', choices = list(backends.BACKENDS), help = 'compute backend')
+    parser.add_argument('--fail-after', type = int, help = 'exit abruptly after given number of tiles (for testing)')
+    args = parser.parse_args()
+    run_worker(args.host, args.port, args.name, args.backend, fail_after = args.fail_after)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Local XYZ tile server for the Mandelbrot set and Julia sets
+
+Start with `python -m tileserver.server` and point any slippy-map viewer at
+    http://127.0.0.1:8000/mandelbrot/{z}/{x}/{y}.png
+    http://127.0.0.1:8000/julia/{z}/{x}/{y}.png?c=-0.8,0.156
+Optional query parameters: max_iter, cmap, colors, interpolation, color_norm (see tileserver.tiles.DEFAULTS).
+http://127.0.0.1:8000/stats returns cache statistics as JSON.
+"""
+# import own .py files
+from tileserver.store import TileStore
+from tileserver.tiles import make_spec, render_tile, spec_key
+
+# import statements
+import argparse
+import json
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TILE_PATH = re.compile(r'^/(mandelbrot|julia)/(\d+)/(\d+)/(\d+)\.png$')
+
+def init_worker():
+    """Use the fastest single-threaded backend in the worker processes (the pool itself provides the parallelism)"""
+    from fractals import backends
+    backends.select_backend(backends.get_serial_backend().name)
+
+class TileRenderer(object):
+    """Returns tiles from the store or renders them in a process pool (concurrent requests for the same tile are merged)"""
+    def __init__(self, store, workers = None):
+        """Constructor of TileRenderer class instance
+
+        Args
+        ----
+        store: class instance of TileStore
+        workers: int
+            number of worker processes (default: number of CPUs)
+        """
+        self.store = store
+        self.executor = ProcessPoolExecutor(max_workers = workers, mp_context = multiprocessing.get_context('spawn'), initializer = init_worker)
+        self.inflight = {} # tile key -> future of tile that is currently rendered
+        self.lock = threading.RLock() # reentrant as finish runs right away if the render is already done when it is added
+        self.stats = {'hit': 0, 'render': 0, 'merged': 0, 'error': 0} # number of requests per status
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def get_tile(self, spec):
+        """Return PNG bytes of tile and how it was obtained ('hit', 'render' or 'merged' with a running render)"""
+        key = spec_key(spec)
+        data = self.store.get(key)
+        if data is not None:
+            self.count('hit')
+            return data, 'hit'
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is not None:
+                status = 'merged'
+            else:
+                data = self.store.get(key) # render might have finished since we checked the store
+                if data is not None:
+                    self.stats['hit'] += 1
+                    return data, 'hit'
+                future = self.executor.submit(render_tile, spec)
+                self.inflight[key] = future
+                future.add_done_callback(lambda f: self.finish(key, f))
+                status = 'render'
+            self.stats[status] += 1
+        return future.result(), status
+
+    def finish(self, key, future):
+        """Store rendered tile, then allow new renders of it (so that later requests find it in the store)"""
+        if future.exception() is None:
+            self.store.put(key, future.result())
+        else:
+            self.count('error')
+        with self.lock:
+            self.inflight.pop(key, None)
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, inflight = len(self.inflight), store_bytes = self.store.size)
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+class TileRequestHandler(BaseHTTPRequestHandler):
+    """Handles GET requests for tiles and statistics"""
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            return self.send(200, 'application/json', json.dumps(self.server.renderer.get_stats()).encode())
+        match = TILE_PATH.match(url.path)
+        if match is None:
+            return self.send(404, 'text/plain', b'not found')
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if 'c' in params:
+                params['c'] = params['c'].split(',')
+            spec = make_spec(match.group(1), int(match.group(2)), int(match.group(3)), int(match.group(4)), params)
+        except ValueError as e:
+            return self.send(400, 'text/plain', str(e).encode())
+        try:
+            data, status = self.server.renderer.get_tile(spec)
+        except Exception as e:
+            return self.send(500, 'text/plain', 'rendering failed: {}'.format(e).encode())
+        self.send(200, 'image/png', data, {'X-Tile-Cache': status, 'Cache-Control': 'public, max-age=86400'})
+
+    def send(self, code, content_type, body, headers = {}):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class TileServer(ThreadingHTTPServer):
+    """HTTP server that only listens on localhost"""
+    daemon_threads = True
+    request_queue_size = 128 # many map clients open several connections at once
+
+    def __init__(self, renderer, port = 8000, verbose = False):
+        super().__init__(('127.0.0.1', port), TileRequestHandler)
+        self.renderer = renderer
+        self.verbose = verbose
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Local XYZ tile server for fractals')
+    parser.add_argument('--port', type = int, default = 8000)
+    parser.add_argument('--store', default = 'tile_store', help = 'directory of the persistent tile store')
+    parser.add_argument('--max-mb', type = float, default = 512, help = 'maximum size of the tile store in MB')
+    parser.add_argument('--workers', type = int, help = 'number of render processes (default: number of CPUs)')
+    parser.add_argument('--verbose', action = 'store_true', help = 'log every request')
+    args = parser.parse_args()
+
+    renderer = TileRenderer(TileStore(args.store, int(args.max_mb * 1024**2)), args.workers)
+    server = TileServer(renderer, args.port, args.verbose)
+    print('serving tiles on http://127.0.0.1:{}/mandelbrot/{{z}}/{{x}}/{{y}}.png'.format(server.server_address[1]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        renderer.shutdown()
+
+if __name__ == '__main__':
+    main()
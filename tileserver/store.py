@@ -0,0 +1,119 @@
+# import statements
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+class TileStore(object):
+    """Persistent on-disk store of rendered tiles
+
+    Tiles are stored content-addressed (blobs/<sha256 of PNG>), so identical tiles (e.g. the black interior of the
+    Mandelbrot set) are only stored once; refs/<tile key> points to the blob of a tile. If blobs and refs take more than
+    max_bytes, the least recently used blobs are deleted together with the refs that point to them. The order of use
+    is kept in memory (and in the modification times of the blobs, to restore it after a restart).
+    """
+    def __init__(self, root, max_bytes = 512 * 1024**2):
+        """Constructor of TileStore class instance
+
+        Args
+        ----
+        root: str
+            directory of the store (created if it does not exist, reused after a restart)
+        max_bytes: int
+            maximum total size of all stored tiles and refs
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        for name in ('blobs', 'refs'):
+            os.makedirs(os.path.join(root, name), exist_ok = True)
+        self.blobs = OrderedDict() # digest -> size of blob, least recently used first
+        self.refs = {} # digest -> set of tile keys that point to the blob
+        self.ref_digest = {} # tile key -> digest of its blob
+        self.size = 0
+        for path in sorted(self.list_files('blobs'), key = os.path.getmtime):
+            self.blobs[os.path.basename(path)] = os.path.getsize(path)
+            self.size += self.blobs[os.path.basename(path)]
+        for path in self.list_files('refs'):
+            with open(path) as f:
+                digest = f.read().strip()
+            if digest in self.blobs:
+                self.refs.setdefault(digest, set()).add(os.path.basename(path))
+                self.ref_digest[os.path.basename(path)] = digest
+                self.size += len(digest)
+            else: # blob was deleted (e.g. by an older version that did not delete refs)
+                os.remove(path)
+
+    def list_files(self, kind):
+        """Return paths of all stored blobs / refs"""
+        kind_dir = os.path.join(self.root, kind)
+        return [os.path.join(kind_dir, sub, name) for sub in os.listdir(kind_dir) for name in os.listdir(os.path.join(kind_dir, sub))
+                if not name.endswith('.tmp')]
+
+    def get_path(self, kind, digest):
+        """Return path of blob / ref with given hash (split into sub-directories by first two characters)"""
+        return os.path.join(self.root, kind, digest[:2], digest)
+
+    def write_atomic(self, path, data):
+        """Write data to path so that readers never see a partially written file"""
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        fd, tmp_path = tempfile.mkstemp(dir = os.path.dirname(path), suffix = '.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        """Return PNG bytes of tile with given key or None if it is not stored"""
+        ref_path = self.get_path('refs', key)
+        with self.lock:
+            try:
+                with open(ref_path) as f:
+                    digest = f.read().strip()
+                blob_path = self.get_path('blobs', digest)
+                with open(blob_path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return None
+            self.touch(digest)
+        return data
+
+    def touch(self, digest):
+        """Mark blob as recently used"""
+        self.blobs.move_to_end(digest)
+        os.utime(self.get_path('blobs', digest))
+
+    def put(self, key, data):
+        """Store PNG bytes of tile with given key"""
+        digest = hashlib.sha256(data).hexdigest()
+        with self.lock:
+            if digest not in self.blobs:
+                self.write_atomic(self.get_path('blobs', digest), data)
+                self.blobs[digest] = len(data)
+                self.size += len(data)
+            else:
+                self.touch(digest)
+            old_digest = self.ref_digest.get(key)
+            if old_digest is None:
+                self.size += len(digest)
+            elif old_digest != digest: # tile was stored before with other content
+                self.refs[old_digest].discard(key)
+            self.refs.setdefault(digest, set()).add(key)
+            self.ref_digest[key] = digest
+            self.write_atomic(self.get_path('refs', key), digest.encode())
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def evict(self):
+        """Delete least recently used blobs and their refs until the store uses at most 90% of max_bytes"""
+        while self.blobs and self.size > 0.9 * self.max_bytes:
+            digest, size = self.blobs.popitem(last = False)
+            os.remove(self.get_path('blobs', digest))
+            self.size -= size
+            for key in self.refs.pop(digest, ()):
+                del self.ref_digest[key]
+                try:
+                    os.remove(self.get_path('refs', key))
+                except FileNotFoundError:
+                    pass
+                self.size -= len(digest)
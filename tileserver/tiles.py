@@ -0,0 +1,125 @@
+# import own .py files
+from fractals.fractals import Mandelbrot, JuliaSet
+
+# import statements
+import hashlib
+import json
+import struct
+import zlib
+import numpy as np
+
+TILE_SIZE = 256
+MAX_ZOOM = 45 # deeper zoom levels exceed the precision of float64
+
+# viewport (xlim, ylim) of the single tile at zoom level 0 (same as the default viewport of the fractal classes)
+BASE_VIEWPORTS = {
+    'mandelbrot': (np.array([-2.5, 1.5]), np.array([-2.0, 2.0])),
+    'julia': (np.array([-2.0, 2.0]), np.array([-2.0, 2.0])),
+}
+
+# default rendering settings (same as the default settings of main.py)
+DEFAULTS = {'max_iter': 200, 'cmap': 0, 'colors': 4000, 'interpolation': 2, 'color_norm': 1, 'c': [0.0, 0.0]}
+
+def tile_viewport(layer, z, x, y, size = TILE_SIZE):
+    """Return xlim, ylim of tile x, y at zoom level z (x grows to the right, y grows downwards as in slippy maps)
+
+    The limits are the centers of the outermost pixels, so that neighbouring tiles do not share a row / column of pixels.
+
+    Args
+    ----
+    layer: str
+        'mandelbrot' or 'julia'
+    z, x, y: int
+        zoom level and tile coordinates (0 <= x, y < 2^z)
+    size: int
+        number of pixels per tile side
+
+    Returns
+    -------
+    xlim, ylim: np.array containing 2 numeric values
+    """
+    base_xlim, base_ylim = BASE_VIEWPORTS[layer]
+    tile_width, tile_height = (base_xlim[1] - base_xlim[0]) / 2**z, (base_ylim[1] - base_ylim[0]) / 2**z
+    left, top = base_xlim[0] + x * tile_width, base_ylim[1] - y * tile_height
+    px_width, px_height = tile_width / size, tile_height / size
+    xlim = np.array([left + 0.5 * px_width, left + tile_width - 0.5 * px_width])
+    ylim = np.array([top - tile_height + 0.5 * px_height, top - 0.5 * px_height])
+    return xlim, ylim
+
+def make_spec(layer, z, x, y, params):
+    """Validate tile request and return its full specification
+
+    Args
+    ----
+    layer: str
+        'mandelbrot' or 'julia'
+    z, x, y: int
+        zoom level and tile coordinates
+    params: dict
+        rendering settings that differ from DEFAULTS (max_iter, cmap, colors, interpolation, color_norm, c)
+
+    Returns
+    -------
+    spec: dict
+        everything needed to render the tile
+
+    Raises
+    ------
+    ValueError if the request is invalid
+    """
+    if layer not in BASE_VIEWPORTS:
+        raise ValueError('unknown layer {!r}'.format(layer))
+    if not 0 <= z <= MAX_ZOOM or not 0 <= x < 2**z or not 0 <= y < 2**z:
+        raise ValueError('tile {}/{}/{} out of range'.format(z, x, y))
+    spec = dict(DEFAULTS, layer = layer, z = z, x = x, y = y, size = TILE_SIZE)
+    for key, value in params.items():
+        if key not in DEFAULTS:
+            raise ValueError('unknown parameter {!r}'.format(key))
+        spec[key] = [float(v) for v in value] if key == 'c' else int(value)
+    if not (1 <= spec['max_iter'] <= 100000 and 0 <= spec['cmap'] <= 4 and 2 <= spec['colors'] <= 5000
+            and 0 <= spec['interpolation'] <= 2 and 0 <= spec['color_norm'] <= 2 and len(spec['c']) == 2):
+        raise ValueError('rendering settings out of range')
+    if layer == 'mandelbrot':
+        spec['c'] = None # C is not used for the Mandelbrot set (keeps cache key independent of it)
+    return spec
+
+def spec_key(spec):
+    """Return hash that identifies the tile described by spec"""
+    return hashlib.sha256(json.dumps(spec, sort_keys = True).encode()).hexdigest()
+
+def encode_png(rgb):
+    """Encode RGB image as PNG
+
+    Args
+    ----
+    rgb: np.array
+        uint8 array with shape (height, width, 3)
+
+    Returns
+    -------
+    bytes of PNG file
+    """
+    height, width = rgb.shape[:2]
+    raw = np.zeros((height, 1 + 3 * width), dtype = np.uint8) # first byte of every row: filter type 0 (none)
+    raw[:, 1:] = rgb.reshape(height, 3 * width)
+
+    def chunk(chunk_type, data):
+        return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0) # 8 bit RGB
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)) + chunk(b'IEND', b'')
+
+def render_tile(spec):
+    """Calculate and color tile described by spec
+
+    Returns
+    -------
+    bytes of PNG file
+    """
+    xlim, ylim = tile_viewport(spec['layer'], spec['z'], spec['x'], spec['y'], spec['size'])
+    if spec['layer'] == 'mandelbrot':
+        fractal = Mandelbrot(spec['size'], spec['size'], spec['max_iter'], xlim = xlim, ylim = ylim)
+    else:
+        fractal = JuliaSet(spec['size'], spec['size'], spec['max_iter'], C = complex(*spec['c']), xlim = xlim, ylim = ylim)
+    mu_rgb = fractal.render(spec['cmap'], spec['colors'], spec['interpolation'], spec['color_norm'])
+    return encode_png(mu_rgb)